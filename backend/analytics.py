@@ -0,0 +1,124 @@
+import warnings
+from typing import List, Optional
+
+import numpy as np
+
+from columnar import CompactForecast
+
+HOURS_PER_DAY = 24
+
+def _stack(forecasts: List[CompactForecast], field: str, hours: int) -> np.ndarray:
+    """(cities, hours) matrix of one hourly field, NaN-padded for shorter forecasts"""
+    matrix = np.full((len(forecasts), hours), np.nan)
+    for row, forecast in enumerate(forecasts):
+        if forecast.hours is None:
+            continue
+        values = forecast.hours.column(field)[:hours]
+        matrix[row, :len(values)] = values
+    return matrix
+
+def dew_point_c(temp_c: np.ndarray, humidity: np.ndarray) -> np.ndarray:
+    """Magnus-Tetens dew point"""
+    b, c = 17.625, 243.04
+    with np.errstate(divide="ignore", invalid="ignore"):
+        gamma = np.log(np.clip(humidity, 1, 100) / 100.0) + b * temp_c / (c + temp_c)
+        return c * gamma / (b - gamma)
+
+def heat_index_f(temp_f: np.ndarray, humidity: np.ndarray) -> np.ndarray:
+    """NWS heat index: Steadman's simple formula, Rothfusz regression above 80F"""
+    t, rh = temp_f, humidity
+    simple = 0.5 * (t + 61.0 + (t - 68.0) * 1.2 + rh * 0.094)
+    full = (-42.379 + 2.04901523 * t + 10.14333127 * rh - 0.22475541 * t * rh
+            - 6.83783e-3 * t * t - 5.481717e-2 * rh * rh + 1.22874e-3 * t * t * rh
+            + 8.5282e-4 * t * rh * rh - 1.99e-6 * t * t * rh * rh)
+    with np.errstate(invalid="ignore"):
+        # Low-humidity and high-humidity adjustments from the NWS algorithm
+        low_rh = (rh < 13) & (t >= 80) & (t <= 112)
+        full = np.where(low_rh, full - (13 - rh) / 4 * np.sqrt(np.clip(17 - np.abs(t - 95), 0, None) / 17), full)
+        high_rh = (rh > 85) & (t >= 80) & (t <= 87)
+        full = np.where(high_rh, full + (rh - 85) / 10 * (87 - t) / 5, full)
+        return np.where((simple + t) / 2 >= 80, full, simple)
+
+def rolling_mean(matrix: np.ndarray, window: int) -> np.ndarray:
+    """Trailing mean over `window` hours along each row (shorter windows at the start)"""
+    filled = np.nan_to_num(matrix)
+    counts = np.cumsum(~np.isnan(matrix), axis=1)
+    sums = np.cumsum(filled, axis=1)
+    sums[:, window:] = sums[:, window:] - sums[:, :-window]
+    counts[:, window:] = counts[:, window:] - counts[:, :-window]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = sums / counts
+    means[np.isnan(matrix)] = np.nan
+    return means
+
+def linear_trend(matrix: np.ndarray) -> np.ndarray:
+    """Least-squares slope per row (units per hour), ignoring NaN padding"""
+    x = np.broadcast_to(np.arange(matrix.shape[1], dtype=float), matrix.shape)
+    valid = ~np.isnan(matrix)
+    n = valid.sum(axis=1)
+    x_mean = np.where(valid, x, 0).sum(axis=1) / np.maximum(n, 1)
+    y_mean = np.nansum(matrix, axis=1) / np.maximum(n, 1)
+    dx = np.where(valid, x - x_mean[:, None], 0)
+    dy = np.where(valid, matrix - y_mean[:, None], 0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return (dx * dy).sum(axis=1) / (dx * dx).sum(axis=1)
+
+def _to_list(values: np.ndarray, ndigits: int = 2) -> List[Optional[float]]:
+    return [None if np.isnan(v) else v for v in np.round(values, ndigits).tolist()]
+
+def compute_analytics(forecasts: List[CompactForecast], days: int, window: int = 3) -> List[dict]:
+    """Derived hourly and daily series for many locations in one vectorized pass"""
+    if not forecasts:
+        return []
+    hours = days * HOURS_PER_DAY
+
+    temp_c = _stack(forecasts, "temp_c", hours)
+    temp_f = _stack(forecasts, "temp_f", hours)
+    humidity = _stack(forecasts, "humidity", hours)
+    precip = _stack(forecasts, "precip_mm", hours)
+
+    dew_c = dew_point_c(temp_c, humidity)
+    heat_f = heat_index_f(temp_f, humidity)
+    heat_c = (heat_f - 32.0) * 5.0 / 9.0
+    rolling_c = rolling_mean(temp_c, window)
+    precip_accum = np.cumsum(np.nan_to_num(precip), axis=1)
+    precip_accum[np.isnan(precip)] = np.nan
+    trend = linear_trend(temp_c)
+
+    # Daily aggregates over a (cities, days, 24) view
+    daily_shape = (len(forecasts), days, HOURS_PER_DAY)
+    with warnings.catch_warnings():
+        # All-NaN days (padding for shorter forecasts) are expected here
+        warnings.simplefilter("ignore", RuntimeWarning)
+        diurnal = np.nanmax(temp_c.reshape(daily_shape), axis=2) - np.nanmin(temp_c.reshape(daily_shape), axis=2)
+        mean_dew = np.nanmean(dew_c.reshape(daily_shape), axis=2)
+        daily_precip = np.where(np.isnan(precip.reshape(daily_shape)).all(axis=2), np.nan,
+                                np.nansum(precip.reshape(daily_shape), axis=2))
+
+    results = []
+    for row, forecast in enumerate(forecasts):
+        available = min(len(forecast.hours), hours) if forecast.hours is not None else 0
+        available_days = min(len(forecast.days), days)
+        results.append({
+            "location": forecast.location.model_dump(),
+            "window_hours": window,
+            "temp_trend_c_per_hour": None if np.isnan(trend[row]) else round(float(trend[row]), 4),
+            "hourly": {
+                "time": [t.decode() for t in forecast.hours.time[:available].tolist()] if available else [],
+                "dewpoint_c": _to_list(dew_c[row, :available]),
+                "heat_index_c": _to_list(heat_c[row, :available]),
+                "heat_index_f": _to_list(heat_f[row, :available]),
+                "temp_rolling_mean_c": _to_list(rolling_c[row, :available]),
+                "precip_accum_mm": _to_list(precip_accum[row, :available]),
+            },
+            "daily": [
+                {
+                    "date": forecast.days[day][0],
+                    "diurnal_range_c": _to_list(diurnal[row, day:day + 1])[0],
+                    "mean_dewpoint_c": _to_list(mean_dew[row, day:day + 1])[0],
+                    "total_precip_mm": _to_list(daily_precip[row, day:day + 1])[0],
+                }
+                for day in range(available_days)
+            ],
+        })
+    return results
@@ -0,0 +1,77 @@
+"""Micro-benchmark: upstream JSON -> WeatherResponse -> HTTP body for a recorded 10-day forecast
+
+Compares the original path (json.loads + WeatherResponse(**data), then FastAPI's
+response_model validation and jsonable_encoder) with the fast path
+(model_validate_json on the raw bytes, model_dump_json, memoized bytes).
+
+Run from the backend folder:
+    python benchmarks/bench_serialization.py [iterations]
+"""
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from models import WeatherResponse
+
+PAYLOAD = Path(__file__).parent / "payloads" / "forecast_10day.json"
+
+def bench(label, fn, iterations):
+    fn()  # warm up
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    per_call = (time.perf_counter() - start) / iterations * 1000
+    print(f"{label:<44} {per_call:8.3f} ms/op")
+    return per_call
+
+def main(iterations: int = 200):
+    raw = PAYLOAD.read_bytes()
+    print(f"Payload: {PAYLOAD.name} ({len(raw) / 1024:.1f} KiB), {iterations} iterations\n")
+
+    field = create_response_field(name="response", type_=WeatherResponse)
+    loop = asyncio.new_event_loop()
+
+    def fastapi_body(weather):
+        content = loop.run_until_complete(serialize_response(field=field, response_content=weather, is_coroutine=True))
+        return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+    def original_parse():
+        return WeatherResponse(**json.loads(raw))
+
+    def fast_parse():
+        return WeatherResponse.model_validate_json(raw)
+
+    weather = fast_parse()
+    memo = {}
+
+    def memoized_body():
+        body = memo.get(id(weather))
+        if body is None:
+            body = memo[id(weather)] = weather.model_dump_json().encode()
+        return body
+
+    print("Parse upstream payload")
+    before_parse = bench("  json.loads + WeatherResponse(**data)", original_parse, iterations)
+    after_parse = bench("  WeatherResponse.model_validate_json", fast_parse, iterations)
+
+    print("Serialize cached response")
+    before_body = bench("  response_model validate + jsonable_encoder", lambda: fastapi_body(weather), iterations)
+    after_body = bench("  model_dump_json", lambda: weather.model_dump_json(), iterations)
+    memo_body = bench("  memoized bytes", memoized_body, iterations)
+
+    print("\nEnd to end (cache miss)")
+    print(f"  before {before_parse + before_body:8.3f} ms/op   after {after_parse + after_body:8.3f} ms/op")
+    print("End to end (cache hit)")
+    print(f"  before {before_body:8.3f} ms/op   after {memo_body:8.3f} ms/op")
+    loop.close()
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
@@ -0,0 +1,315 @@
+"""Load-test profiles for the API against a stub WeatherAPI and an in-memory Mongo
+
+Profiles:
+    autocomplete_storm  users typing city names into the search box, one request per keystroke
+    hot_city_herd       many dashboards opening the same few cities at once, starting from a cold cache
+    wallboard_batch     wallboards refreshing 50 cities per POST /api/weather/batch
+
+By default the app runs in-process through httpx's ASGI transport (startup and
+shutdown hooks included), with mongomock-motor standing in for Mongo and
+benchmarks/stub_weatherapi.py started in a child process. Pass --url to load a
+running server instead (point it at a stub yourself and pass --stub-url to get
+upstream call counts).
+
+Each run reports RPS, p50/p95/p99 latency and status codes per endpoint plus
+upstream calls per WeatherAPI endpoint, and saves them as JSON.
+
+Run from the backend folder:
+    python benchmarks/load_test.py hot_city_herd --requests 2000 --concurrency 50 --latency 0.05
+    python benchmarks/load_test.py all --out benchmarks/results
+    python benchmarks/load_test.py --compare before.json after.json
+"""
+import argparse
+import asyncio
+import csv
+import json
+import multiprocessing
+import os
+import random
+import string
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import quote
+
+import httpx
+import numpy as np
+
+BENCH_DIR = Path(__file__).resolve().parent
+BACKEND_DIR = BENCH_DIR.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from stub_weatherapi import serve as serve_stub
+
+# (endpoint label, method, path, JSON body)
+Request = Tuple[str, str, str, Optional[dict]]
+
+def load_city_names() -> List[str]:
+    with open(BACKEND_DIR / "data" / "cities.csv", newline="", encoding="utf-8") as f:
+        return [row["name"] for row in csv.DictReader(f)]
+
+CITY_NAMES = load_city_names()
+
+def autocomplete_storm(rng: random.Random) -> Iterator[Request]:
+    while True:
+        if rng.random() < 0.2:
+            # Typos and places missing from the gazetteer fall through to upstream search
+            city = "".join(rng.choice(string.ascii_lowercase) for _ in range(6))
+        else:
+            city = rng.choice(CITY_NAMES)
+        for end in range(2, min(len(city), 8) + 1):
+            yield "GET /api/cities/search", "GET", f"/api/cities/search?q={quote(city[:end])}", None
+
+def hot_city_herd(rng: random.Random) -> Iterator[Request]:
+    hot = CITY_NAMES[:5]
+    while True:
+        city = quote(rng.choice(hot))
+        if rng.random() < 0.7:
+            yield "GET /api/weather/forecast/{city}", "GET", f"/api/weather/forecast/{city}?days=7&view=chart", None
+        else:
+            yield "GET /api/weather/current/{city}", "GET", f"/api/weather/current/{city}", None
+
+def wallboard_batch(rng: random.Random) -> Iterator[Request]:
+    while True:
+        items = [{"city": city} for city in rng.sample(CITY_NAMES, 50)]
+        yield "POST /api/weather/batch", "POST", "/api/weather/batch", {"items": items, "days": 3}
+
+PROFILES = {
+    "autocomplete_storm": {"generate": autocomplete_storm, "requests": 5000, "concurrency": 100},
+    "hot_city_herd": {"generate": hot_city_herd, "requests": 3000, "concurrency": 200},
+    "wallboard_batch": {"generate": wallboard_batch, "requests": 200, "concurrency": 10},
+}
+
+def summarize(latencies: List[float], statuses: Counter, errors: int, duration: float) -> dict:
+    values = np.array(latencies) * 1000
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+        "rps": round(len(latencies) / duration, 1) if duration else 0.0,
+        "latency_ms": {
+            "mean": round(float(values.mean()), 2),
+            "p50": round(float(np.percentile(values, 50)), 2),
+            "p95": round(float(np.percentile(values, 95)), 2),
+            "p99": round(float(np.percentile(values, 99)), 2),
+            "max": round(float(values.max()), 2),
+        } if len(values) else None,
+    }
+
+async def run_load(client: httpx.AsyncClient, profile: str, requests: int, concurrency: int, seed: int) -> dict:
+    source = PROFILES[profile]["generate"](random.Random(seed))
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    statuses: Dict[str, Counter] = defaultdict(Counter)
+    errors: Counter = Counter()
+    tickets = iter(range(requests))
+
+    async def worker():
+        for _ in tickets:
+            label, method, path, body = next(source)
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, path, json=body)
+                statuses[label][response.status_code] += 1
+                if response.status_code >= 500:
+                    errors[label] += 1
+            except httpx.HTTPError:
+                statuses[label]["exception"] += 1
+                errors[label] += 1
+            latencies[label].append(time.perf_counter() - start)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    duration = time.perf_counter() - started
+
+    all_latencies = [value for values in latencies.values() for value in values]
+    return {
+        "duration_s": round(duration, 3),
+        "endpoints": {label: summarize(latencies[label], statuses[label], errors[label], duration)
+                      for label in latencies},
+        "total": summarize(all_latencies, sum(statuses.values(), Counter()), sum(errors.values()), duration),
+    }
+
+async def stub_stats(stub_url: Optional[str]) -> Optional[dict]:
+    if stub_url is None:
+        return None
+    async with httpx.AsyncClient() as client:
+        return (await client.get(f"{stub_url}/_stats")).json()
+
+async def reset_stub(stub_url: Optional[str]):
+    if stub_url is not None:
+        async with httpx.AsyncClient() as client:
+            await client.post(f"{stub_url}/_reset")
+
+def start_stub(args: argparse.Namespace) -> Tuple[multiprocessing.Process, str]:
+    process = multiprocessing.Process(target=serve_stub, daemon=True, args=("127.0.0.1", args.stub_port), kwargs={
+        "latency": args.latency, "jitter": args.jitter, "error_rate": args.error_rate,
+        "timeout_rate": args.timeout_rate, "seed": args.seed,
+    })
+    process.start()
+    stub_url = f"http://127.0.0.1:{args.stub_port}"
+    for _ in range(100):
+        try:
+            httpx.get(f"{stub_url}/_stats")
+            return process, stub_url
+        except httpx.HTTPError:
+            time.sleep(0.05)
+    process.terminate()
+    raise SystemExit(f"Stub WeatherAPI did not start on port {args.stub_port}")
+
+def load_app(stub_url: str, mongo_url: Optional[str]):
+    """Import server.py configured for the stub upstream and the chosen Mongo"""
+    os.environ["WEATHER_API_KEY"] = "bench"
+    os.environ["WEATHER_API_BASE_URL"] = f"{stub_url}/v1"
+    os.environ.setdefault("DB_NAME", "weather_bench")
+    # Every run starts cold unless a snapshot is asked for explicitly
+    os.environ.setdefault("WEATHER_CACHE_SNAPSHOT", "off")
+    if mongo_url:
+        os.environ["MONGO_URL"] = mongo_url
+    else:
+        try:
+            from mongomock_motor import AsyncMongoMockClient
+        except ImportError:
+            raise SystemExit("In-memory Mongo needs mongomock-motor (pip install mongomock-motor), or pass --mongo-url")
+        import motor.motor_asyncio
+        motor.motor_asyncio.AsyncIOMotorClient = AsyncMongoMockClient
+        os.environ["MONGO_URL"] = "mongodb://in-memory"
+
+    import server
+    return server.app
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+async def run_profile(args: argparse.Namespace) -> dict:
+    profile = PROFILES[args.profile]
+    requests = args.requests or profile["requests"]
+    concurrency = args.concurrency or profile["concurrency"]
+
+    stub_process = None
+    stub_url = args.stub_url
+    if args.url is None and stub_url is None:
+        stub_process, stub_url = start_stub(args)
+
+    try:
+        await reset_stub(stub_url)
+        if args.url is not None:
+            async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout) as client:
+                result = await run_load(client, args.profile, requests, concurrency, args.seed)
+        else:
+            app = load_app(stub_url, args.mongo_url)
+            await app.router.startup()
+            try:
+                transport = httpx.ASGITransport(app=app)
+                async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=args.timeout) as client:
+                    result = await run_load(client, args.profile, requests, concurrency, args.seed)
+            finally:
+                await app.router.shutdown()
+        upstream = await stub_stats(stub_url)
+    finally:
+        if stub_process is not None:
+            stub_process.terminate()
+
+    return {
+        "profile": args.profile,
+        "revision": git_revision(),
+        "timestamp": datetime.utcnow().isoformat(),
+        "config": {
+            "target": args.url or "in-process",
+            "mongo": "external" if args.mongo_url else "in-memory",
+            "requests": requests,
+            "concurrency": concurrency,
+            "seed": args.seed,
+            "stub_latency_s": args.latency,
+            "stub_jitter_s": args.jitter,
+            "stub_error_rate": args.error_rate,
+            "stub_timeout_rate": args.timeout_rate,
+        },
+        **result,
+        "upstream_calls": upstream["calls"] if upstream else None,
+        "upstream_errors": upstream["errors"] if upstream else None,
+    }
+
+def print_report(report: dict):
+    config = report["config"]
+    print(f"\n{report['profile']} @ {report['revision']}: {config['requests']} requests, "
+          f"concurrency {config['concurrency']}, {report['duration_s']}s")
+    print(f"  {'endpoint':<36} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for label, stats in [*report["endpoints"].items(), ("total", report["total"])]:
+        latency = stats["latency_ms"] or {}
+        print(f"  {label:<36} {stats['rps']:>9} {latency.get('p50', '-'):>9} {latency.get('p95', '-'):>9} "
+              f"{latency.get('p99', '-'):>9} {stats['errors']:>7}")
+    if report["upstream_calls"] is not None:
+        print(f"  upstream calls: {report['upstream_calls']}  upstream errors: {report['upstream_errors']}")
+
+def save_report(report: dict, out_dir: Path) -> Path:
+    out_dir.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+    path = out_dir / f"{report['profile']}-{report['revision'] or 'unknown'}-{stamp}.json"
+    path.write_text(json.dumps(report, indent=2))
+    return path
+
+def compare_reports(before_path: str, after_path: str):
+    before = json.loads(Path(before_path).read_text())
+    after = json.loads(Path(after_path).read_text())
+    print(f"{before['profile']}: {before['revision']} -> {after['revision']}")
+    print(f"  {'endpoint':<36} {'rps':>20} {'p95 ms':>20} {'p99 ms':>20}")
+    labels = list(dict.fromkeys([*before["endpoints"], *after["endpoints"], "total"]))
+    for label in labels:
+        old = before["total"] if label == "total" else before["endpoints"].get(label)
+        new = after["total"] if label == "total" else after["endpoints"].get(label)
+        if not old or not new or not old["latency_ms"] or not new["latency_ms"]:
+            continue
+        columns = [(old["rps"], new["rps"])] + [(old["latency_ms"][p], new["latency_ms"][p]) for p in ("p95", "p99")]
+        cells = [f"{a:>8} -> {b:<8}" for a, b in columns]
+        print(f"  {label:<36} {cells[0]:>20} {cells[1]:>20} {cells[2]:>20}")
+    print(f"  upstream calls: {before['upstream_calls']} -> {after['upstream_calls']}")
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Load-test profiles for the weather API")
+    parser.add_argument("profile", nargs="?", choices=[*PROFILES, "all"])
+    parser.add_argument("--requests", type=int, help="total requests (default depends on the profile)")
+    parser.add_argument("--concurrency", type=int, help="concurrent clients (default depends on the profile)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=30.0, help="client timeout per request, in seconds")
+    parser.add_argument("--url", help="load a running server instead of the in-process app")
+    parser.add_argument("--stub-url", help="use an already running stub WeatherAPI")
+    parser.add_argument("--stub-port", type=int, default=9900)
+    parser.add_argument("--mongo-url", help="real Mongo for the in-process app (default: in-memory)")
+    parser.add_argument("--latency", type=float, default=0.05, help="stub upstream latency, in seconds")
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--timeout-rate", type=float, default=0.0)
+    parser.add_argument("--out", default=str(BENCH_DIR / "results"), help="directory for the JSON results")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="compare two saved results")
+    args = parser.parse_args(argv)
+    if args.compare is None and args.profile is None:
+        parser.error("a profile (or --compare) is required")
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.compare:
+        compare_reports(*args.compare)
+        return
+
+    if args.profile == "all":
+        # One process per profile so each starts with cold caches
+        for name in PROFILES:
+            options = [arg for arg in (sys.argv[1:] if argv is None else argv) if arg != "all"]
+            subprocess.run([sys.executable, __file__, name, *options], check=True)
+        return
+
+    report = asyncio.run(run_profile(args))
+    print_report(report)
+    print(f"  saved {save_report(report, Path(args.out))}")
+
+if __name__ == "__main__":
+    main()
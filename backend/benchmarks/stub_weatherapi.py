@@ -0,0 +1,163 @@
+"""Local stand-in for WeatherAPI that replays the recorded payloads
+
+Serves /v1/current.json, /v1/forecast.json (sliced to the requested days)
+and /v1/search.json from benchmarks/payloads, with configurable latency and
+error injection. Locations come from the backend gazetteer (data/cities.csv)
+plus the recorded search results: q resolves to that city's name and
+coordinates ("lat,lon" to the nearest city, unknown names to WeatherAPI's
+1006 error) and search.json returns the cities whose name starts with q.
+GET /_stats returns upstream call counts per endpoint and POST /_reset
+clears them.
+
+Run from the backend folder:
+    python benchmarks/stub_weatherapi.py --port 9900 --latency 0.05 --jitter 0.02 --error-rate 0.01
+"""
+import argparse
+import asyncio
+import csv
+import json
+import random
+from collections import Counter
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Optional
+
+from aiohttp import web
+
+PAYLOADS = Path(__file__).parent / "payloads"
+GAZETTEER = Path(__file__).resolve().parent.parent / "data" / "cities.csv"
+MAX_SEARCH_RESULTS = 10
+
+def load_cities() -> List[dict]:
+    """Gazetteer cities followed by recorded search results it does not already have"""
+    with open(GAZETTEER, newline="", encoding="utf-8") as f:
+        cities = [dict(row, lat=float(row["lat"]), lon=float(row["lon"])) for row in csv.DictReader(f)]
+    known = {(city["name"], city["region"], city["country"]) for city in cities}
+    for city in json.loads((PAYLOADS / "search.json").read_bytes()):
+        if (city["name"], city["region"], city["country"]) not in known:
+            cities.append({field: city[field] for field in ("name", "region", "country", "lat", "lon")})
+    for index, city in enumerate(cities, start=1):
+        city["id"] = index
+        city["url"] = "-".join(f"{city['name']} {city['region']} {city['country']}".lower().replace(",", "").split())
+    return cities
+
+def without_location(payload: dict) -> bytes:
+    """The payload's JSON after its location, so a location can be spliced in per request"""
+    rest = json.dumps({key: value for key, value in payload.items() if key != "location"}).encode()
+    return b"," + rest[1:] if len(rest) > 2 else b"}"
+
+def load_payloads() -> dict:
+    """Pre-serialized bodies so the stub spends no CPU per request"""
+    current = json.loads((PAYLOADS / "current.json").read_bytes())
+    forecast = json.loads((PAYLOADS / "forecast_10day.json").read_bytes())
+    forecastday = forecast["forecast"]["forecastday"]
+    bodies = {"current.json": without_location(current)}
+    for days in range(1, len(forecastday) + 1):
+        bodies[f"forecast.json:{days}"] = without_location(dict(forecast, forecast={"forecastday": forecastday[:days]}))
+    bodies["max_days"] = len(forecastday)
+    bodies["location"] = forecast["location"]
+    return bodies
+
+class StubWeatherAPI:
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                 timeout_rate: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.timeout_rate = timeout_rate
+        self.random = random.Random(seed)
+        self.bodies = load_payloads()
+        self.cities = load_cities()
+        # Recorded tz_id and local time, with each city's own name and coordinates
+        self.locations = {}
+        for city in self.cities:
+            location = dict(self.bodies["location"], **{field: city[field] for field in
+                                                        ("name", "region", "country", "lat", "lon")})
+            self.locations.setdefault(city["name"].lower(), json.dumps(location).encode())
+        self.search = lru_cache(maxsize=4096)(self._search)
+        self.calls = Counter()
+        self.errors = Counter()
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/_stats", self.stats)
+        app.router.add_post("/_reset", self.reset)
+        app.router.add_get("/v1/{endpoint}", self.handle)
+        return app
+
+    async def handle(self, request: web.Request) -> web.Response:
+        endpoint = request.match_info["endpoint"]
+        self.calls[endpoint] += 1
+        if "key" not in request.query:
+            # Keyless requests (health probes) get WeatherAPI's answer without a delay
+            return web.json_response({"error": {"code": 1002, "message": "API key is invalid or not provided."}}, status=401)
+
+        delay = max(self.latency + self.random.uniform(-self.jitter, self.jitter), 0)
+        roll = self.random.random()
+        if roll < self.timeout_rate:
+            # Hang long enough for any sensible client timeout to fire
+            delay = 60
+        if delay:
+            await asyncio.sleep(delay)
+        if roll < self.timeout_rate + self.error_rate:
+            self.errors[endpoint] += 1
+            return web.json_response({"error": {"code": 9999, "message": "Internal application error."}}, status=500)
+
+        query = request.query.get("q", "")
+        if endpoint == "search.json":
+            return web.Response(body=self.search(query.strip().lower()), content_type="application/json")
+        if endpoint == "forecast.json":
+            days = min(max(int(request.query.get("days", "1")), 1), self.bodies["max_days"])
+            rest = self.bodies[f"forecast.json:{days}"]
+        elif endpoint in self.bodies:
+            rest = self.bodies[endpoint]
+        else:
+            return web.json_response({"error": {"code": 1005, "message": "API request url is invalid"}}, status=400)
+        location = self.resolve(query)
+        if location is None:
+            return web.json_response({"error": {"code": 1006, "message": "No matching location found."}}, status=400)
+        return web.Response(body=b'{"location":' + location + rest, content_type="application/json")
+
+    def resolve(self, query: str) -> Optional[bytes]:
+        """Location JSON for a city name or "lat,lon"; "Paris, France" uses the part before the comma"""
+        query = query.strip().lower()
+        if query in self.locations:
+            return self.locations[query]
+        try:
+            lat, lon = (float(part) for part in query.split(","))
+        except ValueError:
+            return self.locations.get(query.split(",")[0].strip())
+        nearest = min(self.cities, key=lambda city: (city["lat"] - lat) ** 2 + (city["lon"] - lon) ** 2)
+        return self.locations[nearest["name"].lower()]
+
+    def _search(self, query: str) -> bytes:
+        matches = [city for city in self.cities
+                   if any(word.startswith(query) for word in [city["name"].lower(), *city["name"].lower().split()])]
+        return json.dumps(matches[:MAX_SEARCH_RESULTS]).encode()
+
+    async def stats(self, request: web.Request) -> web.Response:
+        return web.json_response({"calls": dict(self.calls), "errors": dict(self.errors)})
+
+    async def reset(self, request: web.Request) -> web.Response:
+        self.calls.clear()
+        self.errors.clear()
+        return web.json_response({"status": "reset"})
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9900)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every keyed request")
+    parser.add_argument("--jitter", type=float, default=0.0, help="uniform +/- jitter on the latency, in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with HTTP 500")
+    parser.add_argument("--timeout-rate", type=float, default=0.0, help="fraction of requests that hang for 60s")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args(argv)
+
+def serve(host: str, port: int, **options):
+    web.run_app(StubWeatherAPI(**options).app(), host=host, port=port, print=None)
+
+if __name__ == "__main__":
+    args = parse_args()
+    serve(args.host, args.port, latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+          timeout_rate=args.timeout_rate, seed=args.seed)
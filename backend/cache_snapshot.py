@@ -0,0 +1,183 @@
+import logging
+import mmap
+import os
+import struct
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:
+    # No flock on Windows; a single worker there has nothing to merge with
+    fcntl = None
+
+from shared_cache import SharedEntry
+
+logger = logging.getLogger(__name__)
+
+class CacheSnapshot:
+    """Compact on-disk copy of hot cache entries so a restarted worker does not start cold
+
+    The file is a magic header followed by (expires_at, stale_until, key length,
+    payload length, key, payload) records with wall-clock expiry. It is written
+    to a temp file and renamed into place, and read back through mmap: opening
+    only indexes the live records, and each payload is copied out the first
+    time its key is asked for. Workers of one app share the file, so each write
+    merges in the other workers' live records under an exclusive lock.
+    """
+
+    _magic = b"WDCS\x01"
+    _record = struct.Struct("<ddII")
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self._file = None
+        self._mmap: Optional[mmap.mmap] = None
+        # key -> (payload offset, payload length, expires_at, stale_until)
+        self._index: Dict[str, Tuple[int, int, float, float]] = {}
+
+        self.loaded = 0
+        self.expired = 0
+        self.restored = 0
+        self.written = 0
+        self.merged = 0
+        self.last_written_at: Optional[float] = None
+
+    def write(self, entries: Iterable[Tuple[str, SharedEntry]]) -> int:
+        """Merge the given entries into the snapshot file; returns how many records it now holds"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        with open(self.path.with_name(f"{self.path.name}.lock"), "wb") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            records = dict(entries)
+            # Keep what other workers saved unless this write has a fresher copy
+            self.merged = 0
+            for key, entry in self._read_live():
+                current = records.get(key)
+                if current is None:
+                    self.merged += 1
+                    records[key] = entry
+                elif entry.expires_at > current.expires_at:
+                    records[key] = entry
+            with open(tmp, "wb") as f:
+                f.write(self._magic)
+                for key, entry in records.items():
+                    encoded = key.encode()
+                    f.write(self._record.pack(entry.expires_at, entry.stale_until, len(encoded), len(entry.payload)))
+                    f.write(encoded)
+                    f.write(entry.payload)
+            os.replace(tmp, self.path)
+        self.written = len(records)
+        self.last_written_at = time.time()
+        return self.written
+
+    def _read_live(self) -> List[Tuple[str, SharedEntry]]:
+        """Unexpired records currently in the file, ignoring an unreadable one"""
+        try:
+            data = self.path.read_bytes()
+        except FileNotFoundError:
+            return []
+        if data[:len(self._magic)] != self._magic:
+            return []
+        now = time.time()
+        live = []
+        try:
+            for key, offset, length, expires_at, stale_until in self._records(data):
+                if now < stale_until:
+                    live.append((key, SharedEntry(data[offset:offset + length], expires_at, stale_until)))
+        except (struct.error, UnicodeDecodeError):
+            pass
+        return live
+
+    def _records(self, data) -> Iterator[Tuple[str, int, int, float, float]]:
+        """(key, payload offset, payload length, expires_at, stale_until) for each record after the magic"""
+        offset = len(self._magic)
+        while offset < len(data):
+            expires_at, stale_until, key_length, payload_length = self._record.unpack_from(data, offset)
+            offset += self._record.size
+            key = bytes(data[offset:offset + key_length]).decode()
+            offset += key_length
+            if offset + payload_length > len(data):
+                raise struct.error("truncated payload")
+            yield key, offset, payload_length, expires_at, stale_until
+            offset += payload_length
+
+    def open(self) -> int:
+        """Map the snapshot file and index its unexpired records; returns how many are usable"""
+        self.close()
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            return 0
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty file
+            f.close()
+            return 0
+        if mm[:len(self._magic)] != self._magic:
+            logger.warning(f"Ignoring cache snapshot {self.path} with an unknown format")
+            mm.close()
+            f.close()
+            return 0
+
+        now = time.time()
+        try:
+            for key, offset, length, expires_at, stale_until in self._records(mm):
+                if now < stale_until:
+                    self._index[key] = (offset, length, expires_at, stale_until)
+                else:
+                    self.expired += 1
+        except (struct.error, UnicodeDecodeError) as e:
+            logger.warning(f"Cache snapshot {self.path} is truncated, keeping {len(self._index)} records: {e}")
+
+        self._file, self._mmap = f, mm
+        self.loaded = len(self._index)
+        if not self._index:
+            self.close()
+        return self.loaded
+
+    def keys(self, prefix: str = "") -> List[str]:
+        return [key for key in self._index if key.startswith(prefix)]
+
+    def pending(self) -> List[Tuple[str, SharedEntry]]:
+        """Unexpired entries not yet taken, without consuming them"""
+        now = time.time()
+        return [(key, SharedEntry(self._mmap[offset:offset + length], expires_at, stale_until))
+                for key, (offset, length, expires_at, stale_until) in self._index.items() if now < stale_until]
+
+    def take(self, key: str) -> Optional[SharedEntry]:
+        """Copy one entry out of the snapshot, at most once per key; None if absent or expired"""
+        record = self._index.pop(key, None)
+        if record is None:
+            return None
+        offset, length, expires_at, stale_until = record
+        entry = None
+        if time.time() < stale_until:
+            entry = SharedEntry(self._mmap[offset:offset + length], expires_at, stale_until)
+            self.restored += 1
+        if not self._index:
+            self.close()
+        return entry
+
+    def close(self):
+        self._index.clear()
+        if self._mmap is not None:
+            self._mmap.close()
+            self._file.close()
+        self._mmap = None
+        self._file = None
+
+    def stats(self) -> dict:
+        return {
+            "path": str(self.path),
+            "loaded": self.loaded,
+            "expired_dropped": self.expired,
+            "restored": self.restored,
+            "pending": len(self._index),
+            "written": self.written,
+            "merged_from_other_workers": self.merged,
+            "last_written_at": self.last_written_at,
+        }
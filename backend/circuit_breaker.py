@@ -0,0 +1,96 @@
+import time
+from collections import deque
+from datetime import datetime
+from typing import Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitOpenError(ValueError):
+    """Raised instead of calling upstream while the circuit is open"""
+
+    def __init__(self, retry_in: float):
+        super().__init__("Weather service temporarily unavailable")
+        self.retry_in = retry_in
+
+class CircuitBreaker:
+    """Closed/open/half-open breaker around upstream calls
+
+    Closed: calls go through, consecutive failures are counted.
+    Open: calls fail fast with CircuitOpenError until reset_timeout has passed.
+    Half-open: a limited number of trial calls decide whether to close or reopen.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30,
+                 half_open_max_calls: int = 1, history: int = 20):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = half_open_max_calls
+
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self._opened_at = 0.0
+        self._trial_calls = 0
+
+        self.rejected = 0
+        self.fallbacks = 0
+        self.transitions = deque(maxlen=history)
+
+    def _transition(self, state: str, reason: str):
+        if state == self.state:
+            return
+        self.transitions.append({
+            "from": self.state,
+            "to": state,
+            "reason": reason,
+            "at": datetime.utcnow().isoformat(),
+        })
+        self.state = state
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+        if state != HALF_OPEN:
+            self._trial_calls = 0
+
+    def _retry_in(self) -> float:
+        return max(self._opened_at + self.reset_timeout - time.monotonic(), 0)
+
+    def before_call(self):
+        """Admit a call or raise CircuitOpenError; admitted calls must end in record_* or release"""
+        if self.state == OPEN and self._retry_in() <= 0:
+            self._transition(HALF_OPEN, "reset timeout elapsed")
+
+        if self.state == OPEN or (self.state == HALF_OPEN and self._trial_calls >= self.half_open_max_calls):
+            self.rejected += 1
+            raise CircuitOpenError(self._retry_in())
+        if self.state == HALF_OPEN:
+            self._trial_calls += 1
+
+    def record_success(self):
+        self.consecutive_failures = 0
+        if self.state == HALF_OPEN:
+            self._transition(CLOSED, "trial call succeeded")
+
+    def record_failure(self, reason: Optional[str] = None):
+        self.consecutive_failures += 1
+        if self.state == HALF_OPEN:
+            self._transition(OPEN, f"trial call failed: {reason}")
+        elif self.state == CLOSED and self.consecutive_failures >= self.failure_threshold:
+            self._transition(OPEN, f"{self.consecutive_failures} consecutive failures, last: {reason}")
+
+    def release(self):
+        """An admitted call ended without a verdict on upstream health (cancelled, refused locally)"""
+        if self.state == HALF_OPEN and self._trial_calls > 0:
+            self._trial_calls -= 1
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "failure_threshold": self.failure_threshold,
+            "reset_timeout_s": self.reset_timeout,
+            "retry_in_s": round(self._retry_in(), 1) if self.state == OPEN else 0,
+            "rejected": self.rejected,
+            "served_from_cache": self.fallbacks,
+            "transitions": list(self.transitions),
+        }
@@ -0,0 +1,177 @@
+import bisect
+import csv
+import logging
+import re
+import unicodedata
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from models import CitySearchResult
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_GAZETTEER = Path(__file__).parent / "data" / "cities.csv"
+
+CityKey = Tuple[str, str, str]
+
+def normalize_name(text: str) -> str:
+    """Lowercase, strip accents and collapse whitespace for matching"""
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return re.sub(r"\s+", " ", text.strip().lower())
+
+def _city_key(city: CitySearchResult) -> CityKey:
+    return (normalize_name(city.name), normalize_name(city.region), normalize_name(city.country))
+
+def _within_edits(a: str, b: str, max_edits: int) -> bool:
+    """Bounded Levenshtein check that bails out as soon as the row minimum exceeds max_edits"""
+    if abs(len(a) - len(b)) > max_edits:
+        return False
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if min(current) > max_edits:
+            return False
+        previous = current
+    return previous[-1] <= max_edits
+
+class CityIndex:
+    """In-memory autocomplete index over a sorted array of normalized city names
+
+    Seeded from a bundled gazetteer and grown with every CitySearchResult seen
+    upstream. Prefix lookups are a bisect plus a short scan; a small fuzzy
+    layer tolerates one or two typos when nothing matches by prefix.
+    """
+
+    def __init__(self, max_scan: int = 500):
+        self.max_scan = max_scan
+        self._cities: Dict[CityKey, CitySearchResult] = {}
+        self._by_name_country: Dict[Tuple[str, str], List[CityKey]] = defaultdict(list)
+        self._names: List[Tuple[str, CityKey]] = []
+        self._popularity: Dict[CityKey, int] = defaultdict(int)
+
+        self.prefix_hits = 0
+        self.fuzzy_hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._cities)
+
+    def load_gazetteer(self, path: Optional[Path] = None) -> int:
+        """Load name,region,country,lat,lon rows from a CSV gazetteer"""
+        path = Path(path) if path else DEFAULT_GAZETTEER
+        loaded = 0
+        try:
+            with open(path, newline="", encoding="utf-8") as f:
+                for row in csv.DictReader(f):
+                    self.add(CitySearchResult(
+                        name=row["name"],
+                        region=row.get("region") or "",
+                        country=row["country"],
+                        lat=float(row["lat"]),
+                        lon=float(row["lon"]),
+                    ))
+                    loaded += 1
+        except (OSError, KeyError, ValueError) as e:
+            logger.warning(f"Could not load city gazetteer from {path}: {e}")
+        return loaded
+
+    def add(self, city: CitySearchResult):
+        """Insert or update a city; upstream results replace nearby gazetteer entries"""
+        key = _city_key(city)
+        name_country = (key[0], key[2])
+
+        # Same name and country within ~50km is treated as the same place
+        for existing_key in self._by_name_country[name_country]:
+            existing = self._cities[existing_key]
+            if abs(existing.lat - city.lat) <= 0.5 and abs(existing.lon - city.lon) <= 0.5:
+                if existing_key != key:
+                    self._remove(existing_key)
+                    self._popularity[key] += self._popularity.pop(existing_key, 0)
+                break
+
+        if key not in self._cities:
+            bisect.insort(self._names, (key[0], key))
+            self._by_name_country[name_country].append(key)
+        self._cities[key] = city
+
+    def add_many(self, cities: Iterable[CitySearchResult]):
+        for city in cities:
+            self.add(city)
+
+    def _remove(self, key: CityKey):
+        del self._cities[key]
+        index = bisect.bisect_left(self._names, (key[0], key))
+        if index < len(self._names) and self._names[index][1] == key:
+            del self._names[index]
+        self._by_name_country[(key[0], key[2])].remove(key)
+
+    def record_popularity(self, name: str, region: str, country: str, count: int = 1):
+        """Bump the ranking weight of a city (fed from search history)"""
+        self._popularity[(normalize_name(name), normalize_name(region), normalize_name(country))] += count
+
+    def load_popularity(self, rows: Iterable[dict]):
+        """Seed ranking weights from /history/popular style rows"""
+        for row in rows:
+            self.record_popularity(row["city_name"], row.get("region") or "", row.get("country") or "", row["search_count"])
+
+    def _rank(self, keys: Iterable[CityKey], limit: int) -> List[CitySearchResult]:
+        ranked = sorted(keys, key=lambda k: (-self._popularity.get(k, 0), len(k[0]), k))
+        return [self._cities[k] for k in ranked[:limit]]
+
+    def rank(self, cities: Iterable[CitySearchResult], limit: int = 10) -> List[CitySearchResult]:
+        """Order arbitrary results by popularity, dropping duplicates"""
+        by_key = {}
+        for city in cities:
+            by_key.setdefault(_city_key(city), city)
+        ranked = sorted(by_key, key=lambda k: (-self._popularity.get(k, 0), len(k[0]), k))
+        return [by_key[k] for k in ranked[:limit]]
+
+    def search(self, query: str, limit: int = 10) -> List[CitySearchResult]:
+        """Prefix matches on city name, narrowed by an optional ', region/country' suffix"""
+        name, _, qualifier = normalize_name(query).partition(",")
+        name, qualifier = name.strip(), qualifier.strip()
+        if not name:
+            return []
+
+        matches = []
+        start = bisect.bisect_left(self._names, (name,))
+        for candidate, key in self._names[start:start + self.max_scan]:
+            if not candidate.startswith(name):
+                break
+            if qualifier and not (key[1].startswith(qualifier) or key[2].startswith(qualifier)):
+                continue
+            matches.append(key)
+
+        if matches:
+            self.prefix_hits += 1
+        return self._rank(matches, limit)
+
+    def fuzzy_search(self, query: str, limit: int = 10) -> List[CitySearchResult]:
+        """Typo-tolerant prefix match: compares the query against same-length name prefixes"""
+        name = normalize_name(query).partition(",")[0].strip()
+        if len(name) < 3:
+            self.misses += 1
+            return []
+
+        max_edits = 1 if len(name) < 7 else 2
+        matches = [
+            key for candidate, key in self._names
+            if _within_edits(name, candidate[:len(name)], max_edits)
+        ]
+        if matches:
+            self.fuzzy_hits += 1
+        else:
+            self.misses += 1
+        return self._rank(matches, limit)
+
+    def stats(self) -> dict:
+        return {
+            "cities": len(self._cities),
+            "prefix_hits": self.prefix_hits,
+            "fuzzy_hits": self.fuzzy_hits,
+            "misses": self.misses,
+        }
@@ -0,0 +1,129 @@
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from pydantic import TypeAdapter
+
+from models import (
+    CurrentWeather, DayWeather, Forecast, ForecastDay, HourWeather, Location,
+    WeatherCondition, WeatherResponse
+)
+
+# Column layout derived from HourWeather so new numeric fields are picked up automatically
+FLOAT_FIELDS = [name for name, field in HourWeather.model_fields.items() if field.annotation is float]
+INT_FIELDS = [name for name, field in HourWeather.model_fields.items() if field.annotation is int]
+
+# Validating plain rows in one pydantic-core call beats per-hour model_construct
+_hour_list = TypeAdapter(List[HourWeather])
+
+class InternTable:
+    """Process-wide table of repeated values (condition objects, wind directions) stored by index"""
+
+    def __init__(self):
+        self.values: List = []
+        self._index: Dict = {}
+
+    def intern(self, key, value=None) -> int:
+        index = self._index.get(key)
+        if index is None:
+            index = self._index[key] = len(self.values)
+            self.values.append(key if value is None else value)
+        return index
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+_conditions = InternTable()
+_wind_dirs = InternTable()
+
+def _intern_condition(condition: WeatherCondition) -> int:
+    # Interned conditions are shared WeatherCondition instances, so materialized hours reuse them
+    key = (condition.text, condition.icon, condition.code)
+    return _conditions.intern(key, WeatherCondition.model_construct(text=key[0], icon=key[1], code=key[2]))
+
+class HourlyColumns:
+    """Hourly forecast for every day of one location as per-field typed arrays"""
+
+    __slots__ = ("time", "condition", "wind_dir", "floats", "ints", "day_offsets")
+
+    def __init__(self, forecastday: List[ForecastDay]):
+        hours = [hour for day in forecastday for hour in day.hour]
+        self.day_offsets = np.cumsum([0] + [len(day.hour) for day in forecastday]).astype(np.int32)
+        self.time = np.array([hour.time for hour in hours], dtype="S16")
+        self.condition = np.array([_intern_condition(hour.condition) for hour in hours], dtype=np.uint16)
+        self.wind_dir = np.array([_wind_dirs.intern(hour.wind_dir) for hour in hours], dtype=np.uint8)
+        self.floats = {name: np.array([getattr(hour, name) for hour in hours], dtype=np.float64)
+                       for name in FLOAT_FIELDS}
+        self.ints = {name: np.array([getattr(hour, name) for hour in hours], dtype=np.int32)
+                     for name in INT_FIELDS}
+
+    def __len__(self) -> int:
+        return len(self.time)
+
+    def column(self, name: str) -> np.ndarray:
+        """A numeric hourly series across all days"""
+        if name in self.floats:
+            return self.floats[name]
+        return self.ints[name]
+
+    def day_slice(self, day: int) -> slice:
+        return slice(int(self.day_offsets[day]), int(self.day_offsets[day + 1]))
+
+    def materialize(self, day: int) -> List[HourWeather]:
+        """Build HourWeather objects for one day (done only when a response is serialized)"""
+        window = self.day_slice(day)
+        columns = {name: values[window].tolist() for name, values in self.floats.items()}
+        columns.update({name: values[window].tolist() for name, values in self.ints.items()})
+        columns["time"] = [t.decode() for t in self.time[window].tolist()]
+        columns["condition"] = [_conditions.values[i] for i in self.condition[window].tolist()]
+        columns["wind_dir"] = [_wind_dirs.values[i] for i in self.wind_dir[window].tolist()]
+
+        names = list(columns)
+        return _hour_list.validate_python([dict(zip(names, row)) for row in zip(*columns.values())])
+
+    @property
+    def nbytes(self) -> int:
+        arrays = [self.time, self.condition, self.wind_dir, self.day_offsets, *self.floats.values(), *self.ints.values()]
+        return sum(array.nbytes for array in arrays)
+
+class CompactForecast:
+    """Cache-friendly forecast: pydantic models for the small parts, columns for the hours"""
+
+    __slots__ = ("location", "current", "days", "hours")
+
+    def __init__(self, location: Location, current: CurrentWeather,
+                 days: List[Tuple[str, DayWeather]], hours: Optional[HourlyColumns]):
+        self.location = location
+        self.current = current
+        self.days = days
+        self.hours = hours
+
+    @classmethod
+    def from_response(cls, weather: WeatherResponse) -> "CompactForecast":
+        if weather.forecast is None:
+            return cls(weather.location, weather.current, [], None)
+        forecastday = weather.forecast.forecastday
+        return cls(
+            weather.location,
+            weather.current,
+            [(day.date, day.day) for day in forecastday],
+            HourlyColumns(forecastday),
+        )
+
+    def to_response(self, days: Optional[int] = None) -> WeatherResponse:
+        """Materialize a WeatherResponse for the first `days` days (None for current only)"""
+        if days is None or self.hours is None:
+            return WeatherResponse(location=self.location, current=self.current, forecast=None)
+
+        forecastday = [
+            ForecastDay.model_construct(date=date, day=day, hour=self.hours.materialize(index))
+            for index, (date, day) in enumerate(self.days[:days])
+        ]
+        return WeatherResponse.model_construct(
+            location=self.location, current=self.current,
+            forecast=Forecast.model_construct(forecastday=forecastday),
+        )
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate footprint: hourly arrays plus a flat allowance for the models"""
+        return (self.hours.nbytes if self.hours is not None else 0) + 2048 + 1024 * len(self.days)
@@ -0,0 +1,69 @@
+import math
+import re
+from collections import OrderedDict
+from typing import Tuple
+
+from models import Location
+
+Cell = Tuple[int, int]
+
+_COORDINATES = re.compile(r"^\s*-?\d+(\.\d+)?\s*,\s*-?\d+(\.\d+)?\s*$")
+
+def is_coordinate_query(query: str) -> bool:
+    return bool(_COORDINATES.match(query))
+
+class GeoGrid:
+    """Snaps coordinates to fixed-size grid cells and remembers which named location answers each cell
+
+    Coordinate lookups in the same cell share one upstream query: the name of
+    a location already resolved inside the cell (so they reuse its cached
+    forecast), or else the cell centre.
+    """
+
+    def __init__(self, cell_size: float = 0.05, max_cells: int = 50000):
+        self.cell_size = cell_size
+        self.max_cells = max_cells
+        self._cells: "OrderedDict[Cell, str]" = OrderedDict()
+        self.named_hits = 0
+        self.center_hits = 0
+
+    def cell(self, lat: float, lon: float) -> Cell:
+        return math.floor(lat / self.cell_size), math.floor(lon / self.cell_size)
+
+    def _center(self, cell: Cell) -> str:
+        lat = min(max((cell[0] + 0.5) * self.cell_size, -90.0), 90.0)
+        lon = min(max((cell[1] + 0.5) * self.cell_size, -180.0), 180.0)
+        return f"{lat:.4f},{lon:.4f}"
+
+    def query_for(self, lat: float, lon: float, count: bool = True) -> str:
+        """Upstream query (and so cache key) for a coordinate lookup"""
+        if self.cell_size <= 0:
+            return f"{lat},{lon}"
+        cell = self.cell(lat, lon)
+        named = self._cells.get(cell)
+        if named is not None:
+            if count:
+                self._cells.move_to_end(cell)
+                self.named_hits += 1
+            return named
+        if count:
+            self.center_hits += 1
+        return self._center(cell)
+
+    def record(self, query: str, location: Location):
+        """Remember that a by-name query resolved to a location inside some cell"""
+        if self.cell_size <= 0 or is_coordinate_query(query):
+            return
+        cell = self.cell(location.lat, location.lon)
+        self._cells[cell] = query
+        self._cells.move_to_end(cell)
+        while len(self._cells) > self.max_cells:
+            self._cells.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {
+            "cell_size_deg": self.cell_size,
+            "named_cells": len(self._cells),
+            "named_hits": self.named_hits,
+            "center_hits": self.center_hits,
+        }
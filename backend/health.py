@@ -0,0 +1,85 @@
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+Check = Callable[[], Awaitable[Optional[dict]]]
+
+class HealthProber:
+    """Runs dependency checks on an interval and keeps the latest results for the health routes
+
+    A check is an async callable that raises (or times out) when the dependency
+    is unhealthy; a returned dict is merged into its result as details.
+    """
+
+    def __init__(self, checks: Dict[str, Check], interval: float = 15.0, timeout: float = 3.0):
+        self.checks = checks
+        self.interval = interval
+        self.timeout = timeout
+
+        self.results: Dict[str, dict] = {}
+        self.rounds = 0
+        self.last_round: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """Start the probe loop; the first round runs right away"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.probe()
+            except Exception as e:
+                logger.error(f"Health probe round failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def probe(self):
+        """Run every check once, concurrently, and replace the cached results"""
+        names = list(self.checks)
+        results = await asyncio.gather(*(self._check(name) for name in names))
+        self.results = dict(zip(names, results))
+        self.rounds += 1
+        self.last_round = time.monotonic()
+
+    async def _check(self, name: str) -> dict:
+        start = time.perf_counter()
+        result = {"ok": True}
+        try:
+            details = await asyncio.wait_for(self.checks[name](), self.timeout)
+            if details:
+                result.update(details)
+        except asyncio.TimeoutError:
+            result = {"ok": False, "error": f"timed out after {self.timeout}s"}
+        except Exception as e:
+            result = {"ok": False, "error": str(e) or type(e).__name__}
+        if not result["ok"]:
+            logger.warning(f"Health check {name} failed: {result['error']}")
+        result["latency_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        result["checked_at"] = datetime.utcnow().isoformat()
+        return result
+
+    def healthy(self, names: Optional[Iterable[str]] = None) -> bool:
+        """True once every named check (default: all) has passed in the latest round"""
+        names = self.checks if names is None else names
+        return all(self.results.get(name, {}).get("ok", False) for name in names)
+
+    def stats(self) -> dict:
+        return {
+            "interval_s": self.interval,
+            "rounds": self.rounds,
+            "last_round_age_s": round(time.monotonic() - self.last_round, 1) if self.last_round is not None else None,
+        }
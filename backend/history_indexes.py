@@ -0,0 +1,77 @@
+import logging
+from typing import Optional
+
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+HISTORY_COLLECTION = "search_history"
+TIMESTAMP_INDEX = "search_timestamp_desc"
+CITY_INDEX = "city_country_region"
+
+async def ensure_history_indexes(db, retention_days: Optional[float] = None, capped_size_mb: Optional[int] = None):
+    """Provision search_history indexes and its retention policy
+
+    Retention is either a TTL on search_timestamp (retention_days) or a capped
+    collection (capped_size_mb); capped mode wins if both are configured.
+    """
+    if capped_size_mb:
+        await _ensure_capped(db, capped_size_mb * 1024 * 1024)
+        retention_days = None
+
+    collection = db[HISTORY_COLLECTION]
+    timestamp_options = {"name": TIMESTAMP_INDEX}
+    if retention_days:
+        timestamp_options["expireAfterSeconds"] = int(retention_days * 86400)
+
+    try:
+        await collection.create_index([("search_timestamp", DESCENDING)], **timestamp_options)
+    except OperationFailure as e:
+        # Index exists with different TTL options: update the expiry in place
+        if not retention_days:
+            logger.warning(f"Keeping existing {TIMESTAMP_INDEX} index options: {e}")
+        else:
+            await db.command(
+                "collMod", HISTORY_COLLECTION,
+                index={"name": TIMESTAMP_INDEX, "expireAfterSeconds": timestamp_options["expireAfterSeconds"]},
+            )
+            logger.info(f"Updated search history retention to {retention_days} days")
+
+    await collection.create_index(
+        [("city_name", ASCENDING), ("country", ASCENDING), ("region", ASCENDING)], name=CITY_INDEX)
+
+async def _ensure_capped(db, size_bytes: int):
+    if HISTORY_COLLECTION not in await db.list_collection_names():
+        await db.create_collection(HISTORY_COLLECTION, capped=True, size=size_bytes)
+        return
+
+    stats = await db.command("collStats", HISTORY_COLLECTION)
+    if not stats.get("capped"):
+        # convertToCapped only keeps the _id index, so this must run before index creation
+        logger.info(f"Converting {HISTORY_COLLECTION} to a capped collection of {size_bytes} bytes")
+        await db.command("convertToCapped", HISTORY_COLLECTION, size=size_bytes)
+
+async def history_collection_report(db) -> dict:
+    """Collection size and per-index usage counters for search_history"""
+    stats = await db.command("collStats", HISTORY_COLLECTION)
+    index_usage = []
+    async for index in db[HISTORY_COLLECTION].aggregate([{"$indexStats": {}}]):
+        index_usage.append({
+            "name": index["name"],
+            "key": dict(index["key"]),
+            "ops": index.get("accesses", {}).get("ops", 0),
+            "since": index.get("accesses", {}).get("since"),
+        })
+
+    return {
+        "collection": HISTORY_COLLECTION,
+        "documents": stats.get("count", 0),
+        "size_bytes": stats.get("size", 0),
+        "storage_size_bytes": stats.get("storageSize", 0),
+        "total_index_size_bytes": stats.get("totalIndexSize", 0),
+        "index_sizes": stats.get("indexSizes", {}),
+        "capped": bool(stats.get("capped", False)),
+        "max_size_bytes": stats.get("maxSize"),
+        "index_usage": index_usage,
+    }
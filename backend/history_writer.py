@@ -0,0 +1,130 @@
+import asyncio
+import logging
+from collections import deque
+from typing import Optional
+
+from metrics import stage
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW_POLICIES = ("drop_oldest", "drop_newest", "block")
+
+class HistoryWriter:
+    """Write-behind buffer that batches search history documents into insert_many calls"""
+
+    def __init__(self, collection, batch_size: int = 200, flush_interval: float = 2.0,
+                 max_buffer: int = 10000, overflow_policy: str = "drop_oldest"):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow_policy must be one of {', '.join(OVERFLOW_POLICIES)}")
+
+        self.collection = collection
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.overflow_policy = overflow_policy
+
+        self._buffer: deque = deque()
+        self._wakeup = asyncio.Event()
+        self._drained = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+
+    async def start(self):
+        """Start the background flush loop"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flush loop and write out whatever is still buffered"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        while self._buffer:
+            if not await self.flush():
+                logger.error(f"Dropping {len(self._buffer)} search history records on shutdown")
+                self.dropped += len(self._buffer)
+                self._buffer.clear()
+
+    async def add(self, document: dict):
+        """Buffer a document for the next batch, applying the overflow policy when full"""
+        if len(self._buffer) >= self.max_buffer:
+            if self.overflow_policy == "drop_newest":
+                self.dropped += 1
+                return
+            elif self.overflow_policy == "drop_oldest":
+                self._buffer.popleft()
+                self.dropped += 1
+            else:
+                # Backpressure: hold the caller until a flush frees up space
+                while len(self._buffer) >= self.max_buffer:
+                    self._drained.clear()
+                    self._wakeup.set()
+                    await self._drained.wait()
+
+        self._buffer.append(document)
+        self.enqueued += 1
+        if len(self._buffer) >= self.batch_size:
+            self._wakeup.set()
+
+    async def flush(self) -> bool:
+        """Write one batch; returns False if the insert failed"""
+        async with self._flush_lock:
+            if not self._buffer:
+                return True
+
+            count = min(len(self._buffer), self.batch_size)
+            batch = [self._buffer.popleft() for _ in range(count)]
+            try:
+                with stage("history_flush"):
+                    await self.collection.insert_many(batch, ordered=False)
+            except Exception as e:
+                self.failed_flushes += 1
+                logger.error(f"Failed to write {len(batch)} search history records: {e}")
+                # Put the batch back at the front, keeping within the buffer cap
+                room = max(self.max_buffer - len(self._buffer), 0)
+                self.dropped += len(batch) - min(room, len(batch))
+                self._buffer.extendleft(reversed(batch[:room]))
+                return False
+            finally:
+                self._drained.set()
+
+            self.written += len(batch)
+            self.flushes += 1
+            return True
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            # Drain full batches straight away, then wait for the next tick
+            while self._buffer:
+                if not await self.flush():
+                    break
+                if len(self._buffer) < self.batch_size:
+                    break
+
+    def stats(self) -> dict:
+        return {
+            "buffered": len(self._buffer),
+            "max_buffer": self.max_buffer,
+            "overflow_policy": self.overflow_policy,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "dropped": self.dropped,
+            "flushes": self.flushes,
+            "failed_flushes": self.failed_flushes,
+        }
@@ -0,0 +1,126 @@
+import asyncio
+import logging
+import random
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from circuit_breaker import CircuitOpenError
+from rate_limiter import Priority, UpstreamBudgetExceeded
+
+logger = logging.getLogger(__name__)
+
+class HotCityRefresher:
+    """Keeps the most searched locations warm in the weather cache
+
+    The hot set is reloaded from the popularity counters on an interval.
+    Each hot location is refreshed shortly before its cache entry goes stale,
+    at most a few per tick and with jitter so refreshes do not line up, and
+    only while the upstream budget has room for background work. Locations
+    that drop out of the hot set are no longer refreshed.
+    """
+
+    def __init__(self, weather_service, load_hot: Callable[[int], Awaitable[List[str]]],
+                 top_n: int = 50, lead: float = 60, days: int = 3, reload_interval: float = 300,
+                 tick: float = 5, max_per_tick: int = 5, retry_after: float = 300):
+        self.weather_service = weather_service
+        self.load_hot = load_hot
+        self.top_n = top_n
+        self.lead = lead
+        self.days = days
+        self.reload_interval = reload_interval
+        self.tick = tick
+        self.max_per_tick = max_per_tick
+        self.retry_after = retry_after
+
+        self.hot: List[str] = []
+        # Monotonic time at which each hot location should next be checked
+        self._due: Dict[str, float] = {}
+        self._last_reload: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+        self.refreshed = 0
+        self.already_fresh = 0
+        self.deferred = 0
+        self.failed = 0
+        self.dropped = 0
+
+    async def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                if self._last_reload is None or time.monotonic() - self._last_reload >= self.reload_interval:
+                    await self.reload()
+                await self.run_due()
+            except Exception as e:
+                logger.error(f"Hot city refresh round failed: {e}")
+            await asyncio.sleep(self.tick)
+
+    def _jitter(self) -> float:
+        return random.uniform(0, self.lead / 2)
+
+    async def reload(self):
+        """Replace the hot set with the current top locations"""
+        self._last_reload = time.monotonic()
+        hot = list(dict.fromkeys(await self.load_hot(self.top_n)))
+        cold = set(self._due) - set(hot)
+        for location in cold:
+            del self._due[location]
+        self.dropped += len(cold)
+
+        now = time.monotonic()
+        for location in hot:
+            # Newcomers are checked within the next few ticks rather than all at once
+            self._due.setdefault(location, now + self._jitter())
+        self.hot = hot
+        if cold:
+            logger.info(f"Stopped refreshing {len(cold)} cold locations")
+
+    async def run_due(self):
+        """Refresh up to max_per_tick locations whose next check is due"""
+        now = time.monotonic()
+        due = sorted((at, location) for location, at in self._due.items() if at <= now)[:self.max_per_tick]
+        for _, location in due:
+            if not self.weather_service.upstream_budget.would_allow(Priority.BACKGROUND):
+                # Leave the rest due; they are retried next tick once the bucket refills
+                self.deferred += 1
+                return
+            try:
+                refreshed, next_in = await self.weather_service.refresh_ahead(location, self.lead, self.days)
+            except (UpstreamBudgetExceeded, CircuitOpenError):
+                self.deferred += 1
+                return
+            except Exception as e:
+                logger.warning(f"Hot city refresh failed for {location}: {e}")
+                self.failed += 1
+                next_in = self.retry_after
+            else:
+                if refreshed:
+                    self.refreshed += 1
+                else:
+                    self.already_fresh += 1
+
+            if location in self._due:
+                self._due[location] = time.monotonic() + max(next_in - self._jitter(), self.tick)
+
+    def stats(self) -> dict:
+        return {
+            "hot_locations": len(self.hot),
+            "top_n": self.top_n,
+            "refreshed": self.refreshed,
+            "already_fresh": self.already_fresh,
+            "deferred": self.deferred,
+            "failed": self.failed,
+            "dropped": self.dropped,
+        }
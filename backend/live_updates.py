@@ -0,0 +1,169 @@
+import asyncio
+import json
+import logging
+import random
+from typing import Dict, List, Optional, Set
+
+from rate_limiter import Priority, priority_scope
+from weather_service import normalize_location
+
+logger = logging.getLogger(__name__)
+
+def sse_event(event: str, data: dict) -> str:
+    """One Server-Sent Events frame, formatted once and shared by every subscriber"""
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+class Subscription:
+    """One client's stream of frames for a set of locations"""
+
+    def __init__(self, hub: "LiveWeatherHub", locations: List[str], max_queued: int):
+        self.hub = hub
+        self.locations = locations
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queued)
+        self.resyncs = 0
+
+    def push(self, frame: str):
+        if self.queue.full():
+            # A slow client missed deltas; replace the backlog with fresh snapshots
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.resyncs += 1
+            for location in self.locations:
+                snapshot = self.hub.snapshot(location)
+                if snapshot is not None and not self.queue.full():
+                    self.queue.put_nowait(snapshot)
+            return
+        self.queue.put_nowait(frame)
+
+    async def next(self, timeout: float) -> Optional[str]:
+        """Next frame, or None if nothing arrived within timeout"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+class _LocationPoller:
+    def __init__(self, query: str):
+        self.query = query
+        self.subscribers: Set[Subscription] = set()
+        self.current: Optional[dict] = None
+        self.snapshot: Optional[str] = None
+        self.failing = False
+        self.task: Optional[asyncio.Task] = None
+
+class LiveWeatherHub:
+    """Fans current weather out to subscribed clients from one poller per distinct location
+
+    The first subscriber to a location starts its poller and the last one to
+    leave stops it. Each poller reads through WeatherService, waking when the
+    cached entry goes stale, and pushes a full snapshot to new subscribers and
+    only the changed CurrentWeather fields afterwards.
+    """
+
+    def __init__(self, weather_service, min_interval: float = 15, max_interval: float = 300,
+                 retry_after: float = 60, max_queued: int = 32):
+        self.weather_service = weather_service
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.retry_after = retry_after
+        self.max_queued = max_queued
+        self._pollers: Dict[str, _LocationPoller] = {}
+        self.subscribers = 0
+
+        self.polls = 0
+        self.deltas_sent = 0
+        self.unchanged = 0
+        self.failed = 0
+
+    def subscribe(self, locations: List[str]) -> Subscription:
+        queries = {}
+        for location in locations:
+            queries.setdefault(normalize_location(location), location)
+        subscription = Subscription(self, list(queries), self.max_queued)
+        self.subscribers += 1
+        for key, location in queries.items():
+            poller = self._pollers.get(key)
+            if poller is None:
+                poller = self._pollers[key] = _LocationPoller(location)
+                poller.task = asyncio.create_task(self._poll(poller))
+            poller.subscribers.add(subscription)
+            if poller.snapshot is not None:
+                subscription.push(poller.snapshot)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self.subscribers -= 1
+        for key in subscription.locations:
+            poller = self._pollers.get(key)
+            if poller is None:
+                continue
+            poller.subscribers.discard(subscription)
+            if not poller.subscribers:
+                poller.task.cancel()
+                del self._pollers[key]
+
+    def snapshot(self, key: str) -> Optional[str]:
+        poller = self._pollers.get(key)
+        return poller.snapshot if poller is not None else None
+
+    async def stop(self):
+        pollers = list(self._pollers.values())
+        self._pollers.clear()
+        for poller in pollers:
+            poller.task.cancel()
+        await asyncio.gather(*(poller.task for poller in pollers), return_exceptions=True)
+
+    def _broadcast(self, poller: _LocationPoller, frame: str):
+        for subscription in list(poller.subscribers):
+            subscription.push(frame)
+
+    async def _poll(self, poller: _LocationPoller):
+        key = normalize_location(poller.query)
+        while True:
+            try:
+                await self.poll_once(poller)
+                max_age = self.weather_service.http_max_age(poller.query)
+                delay = min(max(max_age, self.min_interval), self.max_interval)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Live update poll failed for {key}: {e}")
+                self.failed += 1
+                if not poller.failing:
+                    poller.failing = True
+                    self._broadcast(poller, sse_event("error", {"location": key, "message": str(e)}))
+                delay = self.retry_after
+            # Jitter keeps pollers started together from waking together
+            await asyncio.sleep(delay + random.uniform(0, self.min_interval / 2))
+
+    async def poll_once(self, poller: _LocationPoller):
+        """Fetch a location's current weather and push what changed since the last poll"""
+        key = normalize_location(poller.query)
+        self.polls += 1
+        # Viewers already have data, so these calls must not starve interactive lookups
+        with priority_scope(Priority.BACKGROUND):
+            weather = await self.weather_service.get_current_weather(poller.query)
+        current = weather.current.model_dump(mode="json")
+        poller.failing = False
+        poller.snapshot = sse_event("snapshot", {"location": key, "weather": weather.model_dump(mode="json")})
+
+        if poller.current is None:
+            self._broadcast(poller, poller.snapshot)
+        else:
+            delta = {field: value for field, value in current.items() if poller.current.get(field) != value}
+            if not delta:
+                self.unchanged += 1
+            else:
+                self.deltas_sent += 1
+                self._broadcast(poller, sse_event("delta", {"location": key, "current": delta}))
+        poller.current = current
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": self.subscribers,
+            "locations": len(self._pollers),
+            "polls": self.polls,
+            "deltas_sent": self.deltas_sent,
+            "unchanged": self.unchanged,
+            "failed": self.failed,
+        }
@@ -0,0 +1,205 @@
+import bisect
+import contextvars
+import logging
+import random
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Latency buckets in seconds, from cache hits to upstream timeouts
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Metric:
+    """Base for the small set of Prometheus metric types the API exports"""
+
+    type = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple:
+        return tuple(labels.get(name, "") for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"] + self._samples()
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+class Counter(Metric):
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {value}" for key, value in self._values.items()]
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        self._values[self._key(labels)] = value
+
+class CallbackMetric(Metric):
+    """Gauge or counter read from existing stats at scrape time, so hot paths pay nothing"""
+
+    def __init__(self, name: str, help: str, read: Callable[[], Optional[float]], type: str = "gauge"):
+        super().__init__(name, help)
+        self.read = read
+        self.type = type
+
+    def _samples(self) -> List[str]:
+        try:
+            value = self.read()
+        except Exception as e:
+            logger.warning(f"Failed to read metric {self.name}: {e}")
+            return []
+        return [] if value is None else [f"{self.name} {float(value)}"]
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [per-bucket counts (last one is +Inf), sum]
+        self._series: Dict[Tuple, list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def _samples(self) -> List[str]:
+        lines = []
+        for key, (counts, total) in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                labels = _format_labels(self.labelnames, key, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+class Registry:
+    def __init__(self):
+        self.metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """Prometheus text exposition format"""
+        return "\n".join(line for metric in self.metrics for line in metric.render()) + "\n"
+
+REGISTRY = Registry()
+
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "API request latency by route", ("method", "route", "status")))
+REQUESTS_IN_FLIGHT = REGISTRY.register(Gauge(
+    "http_requests_in_flight", "API requests currently being handled"))
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "weather_stage_duration_seconds", "Time spent per processing stage", ("stage",)))
+UPSTREAM_RESPONSES = REGISTRY.register(Counter(
+    "weather_upstream_responses_total", "WeatherAPI responses by endpoint and status code", ("endpoint", "status")))
+UPSTREAM_IN_FLIGHT = REGISTRY.register(Gauge(
+    "weather_upstream_in_flight", "WeatherAPI calls currently in flight", ("endpoint",)))
+
+# Stage timings of the request being handled; tasks spawned by it share the same dict
+_request_stages: contextvars.ContextVar = contextvars.ContextVar("request_stages", default=None)
+
+def record_stage(name: str, seconds: float):
+    STAGE_SECONDS.observe(seconds, stage=name)
+    stages = _request_stages.get()
+    if stages is not None:
+        stages[name] = stages.get(name, 0.0) + seconds
+
+@contextmanager
+def stage(name: str):
+    """Time the enclosed block as one processing stage"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - start)
+
+class MetricsMiddleware:
+    """ASGI middleware recording request latency, in-flight requests and per-request stage breakdowns
+
+    Requests slower than slow_threshold seconds (0 disables) are logged with
+    their stage breakdown, for a slow_sample_rate fraction of them. Event
+    streams stay open for as long as the client listens, so they are left
+    out of the latency histogram, in-flight gauge and slow-request log.
+    """
+
+    def __init__(self, app, slow_threshold: float = 0, slow_sample_rate: float = 1.0):
+        self.app = app
+        self.slow_threshold = slow_threshold
+        self.slow_sample_rate = slow_sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        streaming = False
+        async def send_with_status(message):
+            nonlocal status, streaming
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                content_type = dict(message.get("headers", [])).get(b"content-type", b"")
+                if content_type.startswith(b"text/event-stream"):
+                    streaming = True
+                    REQUESTS_IN_FLIGHT.dec()
+            await send(message)
+
+        stages: Dict[str, float] = {}
+        token = _request_stages.set(stages)
+        REQUESTS_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            _request_stages.reset(token)
+            if not streaming:
+                self._record(scope, status, elapsed, stages)
+
+    def _record(self, scope, status: int, elapsed: float, stages: Dict[str, float]):
+        REQUESTS_IN_FLIGHT.dec()
+        # Templated route path keeps label cardinality bounded
+        route = getattr(scope.get("route"), "path", "unmatched")
+        REQUEST_SECONDS.observe(elapsed, method=scope["method"], route=route, status=status)
+        if self.slow_threshold and elapsed >= self.slow_threshold and random.random() < self.slow_sample_rate:
+            breakdown = " ".join(f"{name}={seconds * 1000:.1f}ms" for name, seconds in sorted(stages.items()))
+            logger.warning(f"Slow request {scope['method']} {scope['path']} {status} "
+                           f"{elapsed * 1000:.1f}ms: {breakdown or 'no stages recorded'}")
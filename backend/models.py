@@ -1,5 +1,5 @@
-from pydantic import BaseModel, Field
-from typing import List, Optional
+from pydantic import BaseModel, Field, model_validator
+from typing import Any, Dict, List, Optional
 from datetime import datetime
 import uuid
 
@@ -124,8 +124,46 @@ class CitySearchResult(BaseModel):
 class WeatherRequest(BaseModel):
     city: str
     days: int = 3  # Number of forecast days
+    view: Optional[str] = None  # full, chart or summary
+    hours: bool = True  # Include hourly forecast data
+    fields: Optional[List[str]] = None  # Hour fields to keep
 
 class ErrorResponse(BaseModel):
     error: str
     message: str
-    code: Optional[str] = None
\ No newline at end of file
+    code: Optional[str] = None
+
+# Batch weather models
+class BatchWeatherItem(BaseModel):
+    city: Optional[str] = None
+    lat: Optional[float] = Field(None, ge=-90, le=90)
+    lon: Optional[float] = Field(None, ge=-180, le=180)
+
+    @model_validator(mode="after")
+    def check_location(self):
+        if not self.city and (self.lat is None or self.lon is None):
+            raise ValueError("Each item needs a city or lat/lon")
+        return self
+
+class BatchWeatherRequest(BaseModel):
+    # Each item is validated as a BatchWeatherItem on its own, so one bad item fails only its result
+    items: List[Dict[str, Any]]
+    days: int = 3
+    stream: bool = False  # Emit NDJSON lines as results complete
+
+class BatchWeatherResult(BaseModel):
+    index: int
+    query: Dict[str, Any]
+    weather: Optional[WeatherResponse] = None
+    error: Optional[ErrorResponse] = None
+
+class BatchWeatherResponse(BaseModel):
+    results: List[BatchWeatherResult]
+    succeeded: int
+    failed: int
+
+# Analytics models
+class AnalyticsRequest(BaseModel):
+    cities: List[str]
+    days: int = 3
+    window: int = 3  # Rolling mean window in hours
@@ -0,0 +1,225 @@
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+
+logger = logging.getLogger(__name__)
+
+# Time windows supported by /history/popular, backed by hourly buckets
+WINDOWS = {
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1),
+    "week": timedelta(weeks=1),
+}
+
+CityKey = Tuple[str, str, str]
+
+def _hour_bucket(timestamp: datetime) -> datetime:
+    return timestamp.replace(minute=0, second=0, microsecond=0)
+
+class PopularityTracker:
+    """Incrementally maintained city popularity counters
+
+    Searches are counted in memory and periodically flushed as $inc updates
+    into two collections: an all-time total per city and hourly buckets used
+    for windowed rankings. Reads never touch the raw search_history.
+    """
+
+    def __init__(self, db, flush_interval: float = 10.0, bucket_retention: timedelta = timedelta(days=8)):
+        self.totals = db.city_popularity
+        self.buckets = db.city_popularity_hourly
+        self.history = db.search_history
+        self.flush_interval = flush_interval
+        self.bucket_retention = bucket_retention
+
+        self._pending: Dict[Tuple[CityKey, datetime], int] = defaultdict(int)
+        self._last_seen: Dict[Tuple[CityKey, datetime], datetime] = {}
+        # Hourly bucket updates whose totals were already written; retried on their own
+        self._retry_buckets: List[UpdateOne] = []
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """Provision indexes, backfill from history if needed and start the flush loop"""
+        await self.totals.create_index(
+            [("city_name", ASCENDING), ("country", ASCENDING), ("region", ASCENDING)], unique=True)
+        await self.totals.create_index([("search_count", DESCENDING)])
+        await self.buckets.create_index(
+            [("hour", ASCENDING), ("city_name", ASCENDING), ("country", ASCENDING), ("region", ASCENDING)],
+            unique=True)
+        await self.buckets.create_index(
+            [("expires_at", ASCENDING)], expireAfterSeconds=0)
+
+        if await self.totals.estimated_document_count() == 0:
+            await self.backfill()
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flush loop and persist any pending counts"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def record(self, city_name: str, country: str, region: str, timestamp: datetime):
+        """Count one search; persisted on the next flush"""
+        key = ((city_name, country, region), _hour_bucket(timestamp))
+        self._pending[key] += 1
+        last_seen = self._last_seen.get(key)
+        if last_seen is None or timestamp > last_seen:
+            self._last_seen[key] = timestamp
+
+    async def flush(self):
+        async with self._flush_lock:
+            if not self._pending and not self._retry_buckets:
+                return
+            pending, last_seen = self._pending, self._last_seen
+            self._pending, self._last_seen = defaultdict(int), {}
+
+            totals: Dict[CityKey, int] = defaultdict(int)
+            totals_last: Dict[CityKey, datetime] = {}
+            retry_ops, self._retry_buckets = self._retry_buckets, []
+            bucket_ops = []
+            for (city, hour), count in pending.items():
+                city_name, country, region = city
+                searched = last_seen[(city, hour)]
+                totals[city] += count
+                if city not in totals_last or searched > totals_last[city]:
+                    totals_last[city] = searched
+                bucket_ops.append(UpdateOne(
+                    {"hour": hour, "city_name": city_name, "country": country, "region": region},
+                    {
+                        "$inc": {"search_count": count},
+                        "$max": {"last_searched": searched},
+                        "$set": {"expires_at": hour + self.bucket_retention},
+                    },
+                    upsert=True,
+                ))
+
+            total_ops = [
+                UpdateOne(
+                    {"city_name": city[0], "country": city[1], "region": city[2]},
+                    {"$inc": {"search_count": count}, "$max": {"last_searched": totals_last[city]}},
+                    upsert=True,
+                )
+                for city, count in totals.items()
+            ]
+
+            try:
+                if total_ops:
+                    await self.totals.bulk_write(total_ops, ordered=False)
+            except Exception as e:
+                logger.error(f"Failed to flush popularity totals: {e}")
+                # Merge the counts back so the next flush retries them
+                for key, count in pending.items():
+                    self._pending[key] += count
+                    previous = self._last_seen.get(key)
+                    if previous is None or last_seen[key] > previous:
+                        self._last_seen[key] = last_seen[key]
+                self._retry_buckets = retry_ops
+                return
+
+            bucket_ops = retry_ops + bucket_ops
+            try:
+                await self.buckets.bulk_write(bucket_ops, ordered=False)
+            except Exception as e:
+                logger.error(f"Failed to flush popularity buckets: {e}")
+                # Totals are already counted; only the hourly buckets are retried
+                self._retry_buckets = bucket_ops
+
+    async def backfill(self):
+        """One-off rebuild of the counters from existing search history"""
+        city_id = {"city_name": "$city_name", "country": "$country", "region": "$region"}
+        since = _hour_bucket(datetime.utcnow()) - self.bucket_retention
+        try:
+            total_ops = [
+                UpdateOne(
+                    row["_id"],
+                    {"$set": {"search_count": row["search_count"], "last_searched": row["last_searched"]}},
+                    upsert=True,
+                )
+                async for row in self.history.aggregate([
+                    {"$group": {
+                        "_id": city_id,
+                        "search_count": {"$sum": 1},
+                        "last_searched": {"$max": "$search_timestamp"},
+                    }},
+                ])
+            ]
+            if total_ops:
+                await self.totals.bulk_write(total_ops, ordered=False)
+
+            bucket_ops = [
+                UpdateOne(
+                    row["_id"],
+                    {"$set": {
+                        "search_count": row["search_count"],
+                        "last_searched": row["last_searched"],
+                        "expires_at": row["_id"]["hour"] + self.bucket_retention,
+                    }},
+                    upsert=True,
+                )
+                async for row in self.history.aggregate([
+                    {"$match": {"search_timestamp": {"$gte": since}}},
+                    {"$group": {
+                        "_id": dict(city_id, hour={"$dateTrunc": {"date": "$search_timestamp", "unit": "hour"}}),
+                        "search_count": {"$sum": 1},
+                        "last_searched": {"$max": "$search_timestamp"},
+                    }},
+                ])
+            ]
+            if bucket_ops:
+                await self.buckets.bulk_write(bucket_ops, ordered=False)
+        except Exception as e:
+            logger.warning(f"Popularity backfill from search history failed: {e}")
+            return
+        logger.info(f"Backfilled popularity counters for {len(total_ops)} cities")
+
+    async def top(self, limit: int = 10, window: Optional[str] = None) -> List[dict]:
+        """Most searched cities, all-time or within one of WINDOWS"""
+        projection = {"_id": 0, "city_name": 1, "country": 1, "region": 1, "search_count": 1, "last_searched": 1}
+        if window is None:
+            cursor = self.totals.find({}, projection).sort("search_count", DESCENDING).limit(limit)
+            return await cursor.to_list(limit)
+
+        since = _hour_bucket(datetime.utcnow() - WINDOWS[window])
+        pipeline = [
+            {"$match": {"hour": {"$gte": since}}},
+            {
+                "$group": {
+                    "_id": {"city_name": "$city_name", "country": "$country", "region": "$region"},
+                    "search_count": {"$sum": "$search_count"},
+                    "last_searched": {"$max": "$last_searched"},
+                }
+            },
+            {"$sort": {"search_count": -1}},
+            {"$limit": limit},
+            {
+                "$project": {
+                    "_id": 0,
+                    "city_name": "$_id.city_name",
+                    "country": "$_id.country",
+                    "region": "$_id.region",
+                    "search_count": 1,
+                    "last_searched": 1,
+                }
+            },
+        ]
+        return await self.buckets.aggregate(pipeline).to_list(limit)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def stats(self) -> dict:
+        return {"pending_keys": len(self._pending)}
@@ -0,0 +1,56 @@
+from typing import Iterable, Optional, Set
+
+from models import HourWeather, WeatherResponse
+
+HOUR_FIELDS = set(HourWeather.model_fields)
+
+# Named projections for the forecast endpoints; None keeps every hour field
+VIEWS = {
+    "full": {"hours": True, "hour_fields": None},
+    # Only what ForecastChart plots from the hourly series
+    "chart": {
+        "hours": True,
+        "hour_fields": {"time", "temp_c", "temp_f", "humidity", "wind_mph", "wind_kph", "condition"},
+    },
+    "summary": {"hours": False, "hour_fields": None},
+}
+
+def resolve_projection(view: Optional[str] = None, hours: bool = True,
+                       fields: Optional[Iterable[str]] = None) -> Optional[dict]:
+    """Turn view/hours/fields parameters into a projection, or None for the full response
+
+    Raises ValueError for an unknown view or hour field.
+    """
+    if view is not None and view not in VIEWS:
+        raise ValueError(f"View must be one of: {', '.join(VIEWS)}")
+
+    projection = dict(VIEWS[view or "full"])
+    if not hours:
+        projection["hours"] = False
+
+    if fields:
+        requested = {field.strip() for field in fields if field.strip()}
+        unknown = requested - HOUR_FIELDS
+        if unknown:
+            raise ValueError(f"Unknown hour fields: {', '.join(sorted(unknown))}")
+        # Always keep the timestamp so the series stays usable
+        projection["hour_fields"] = requested | {"time"}
+
+    if projection["hours"] and projection["hour_fields"] is None:
+        return None
+    return projection
+
+def project_weather(weather: WeatherResponse, projection: dict) -> dict:
+    """Dump only the requested parts of a weather response to JSON-ready data"""
+    if weather.forecast is None:
+        return weather.model_dump(mode="json")
+
+    if not projection["hours"]:
+        return weather.model_dump(mode="json", exclude={"forecast": {"forecastday": {"__all__": {"hour"}}}})
+
+    hour_fields: Set[str] = projection["hour_fields"]
+    return weather.model_dump(mode="json", include={
+        "location": True,
+        "current": True,
+        "forecast": {"forecastday": {"__all__": {"date": True, "day": True, "hour": {"__all__": hour_fields}}}},
+    })
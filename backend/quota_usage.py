@@ -0,0 +1,71 @@
+import asyncio
+import logging
+from typing import Optional
+
+from pymongo import ReturnDocument
+
+from rate_limiter import QuotaBudget
+
+logger = logging.getLogger(__name__)
+
+class QuotaUsageSync:
+    """Keeps the upstream monthly call count in one Mongo document per billing month
+
+    Without it QuotaBudget.monthly_used is per worker and starts from zero on
+    every restart. Each sync $inc's the calls this worker made since the last
+    one into the month's document and adopts the returned total, which
+    includes every other worker's calls.
+    """
+
+    def __init__(self, budget: QuotaBudget, collection, sync_interval: float = 30.0):
+        self.budget = budget
+        self.collection = collection
+        self.sync_interval = sync_interval
+        self._task: Optional[asyncio.Task] = None
+
+        self.syncs = 0
+        self.failed_syncs = 0
+
+    async def start(self):
+        """Seed the budget from the stored count and start the sync loop"""
+        await self.sync()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the sync loop and record the calls made since the last sync"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.sync()
+
+    async def sync(self) -> bool:
+        """Push this worker's new calls and pull the shared total; returns False if Mongo failed"""
+        month, calls = self.budget.take_unsynced()
+        try:
+            usage = await self.collection.find_one_and_update(
+                {"_id": month},
+                {"$inc": {"calls": calls}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+        except Exception as e:
+            logger.warning(f"Failed to sync upstream quota usage for {month}: {e}")
+            self.failed_syncs += 1
+            self.budget.restore_unsynced(month, calls)
+            return False
+        self.syncs += 1
+        self.budget.synced(month, usage["calls"])
+        return True
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            await self.sync()
+
+    def stats(self) -> dict:
+        return {"sync_interval_s": self.sync_interval, "syncs": self.syncs, "failed_syncs": self.failed_syncs}
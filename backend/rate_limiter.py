@@ -0,0 +1,145 @@
+import asyncio
+import contextvars
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from enum import IntEnum
+from typing import Dict, Optional, Tuple
+
+class Priority(IntEnum):
+    INTERACTIVE = 0
+    BACKGROUND = 1
+
+# Priority of the upstream calls made by the current task; background jobs override it
+_current_priority: contextvars.ContextVar = contextvars.ContextVar("upstream_priority", default=Priority.INTERACTIVE)
+
+def current_priority() -> Priority:
+    return _current_priority.get()
+
+@contextmanager
+def priority_scope(priority: Priority):
+    """Run the enclosed upstream calls (and tasks spawned from them) at the given priority"""
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+class UpstreamBudgetExceeded(ValueError):
+    """Raised instead of calling upstream when the local quota budget says no"""
+
+    def __init__(self):
+        super().__init__("API key exceeded quota")
+
+class QuotaBudget:
+    """Token bucket for the per-minute rate plus a monthly call budget, with priority reserves
+
+    Interactive calls may use the whole bucket and wait briefly for a token.
+    Lower priorities never wait and are refused once the bucket drops below
+    their reserve, or once the month's remaining budget is inside the reserve.
+    """
+
+    def __init__(self, per_minute: int = 1000, monthly_quota: int = 1_000_000,
+                 monthly_reserve: float = 0.05, interactive_wait: float = 0.5):
+        self.capacity = float(per_minute)
+        self.refill_rate = per_minute / 60.0
+        self.monthly_quota = monthly_quota
+        self.monthly_reserve = monthly_reserve
+        self.interactive_wait = interactive_wait
+        # Fraction of the bucket that must remain before each priority may spend a token
+        self.bucket_reserve = {Priority.INTERACTIVE: 0.0, Priority.BACKGROUND: 0.3}
+
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._month = self._month_key()
+        self.monthly_used = 0
+        # Calls spent here since monthly_used was last reconciled with the shared count
+        self._unsynced = 0
+        self._blocked_until = 0.0
+
+        self.granted: Dict[str, int] = {p.name.lower(): 0 for p in Priority}
+        self.shed: Dict[str, int] = {p.name.lower(): 0 for p in Priority}
+
+    @staticmethod
+    def _month_key() -> str:
+        return datetime.utcnow().strftime("%Y-%m")
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.refill_rate)
+        self._updated = now
+        month = self._month_key()
+        if month != self._month:
+            self._month = month
+            self.monthly_used = 0
+            self._unsynced = 0
+
+    def _allowed(self, priority: Priority) -> bool:
+        if time.monotonic() < self._blocked_until:
+            return False
+        monthly_remaining = self.monthly_quota - self.monthly_used
+        if monthly_remaining <= 0:
+            return False
+        if priority != Priority.INTERACTIVE and monthly_remaining <= self.monthly_quota * self.monthly_reserve:
+            return False
+        return self._tokens - 1 >= self.capacity * self.bucket_reserve[priority]
+
+    def would_allow(self, priority: Optional[Priority] = None) -> bool:
+        self._refill()
+        return self._allowed(current_priority() if priority is None else priority)
+
+    async def acquire(self, priority: Optional[Priority] = None):
+        """Spend one upstream call, or raise UpstreamBudgetExceeded"""
+        priority = current_priority() if priority is None else priority
+        self._refill()
+        if not self._allowed(priority) and priority == Priority.INTERACTIVE and self._can_wait():
+            # Short wait for the bucket to refill rather than failing a user request outright
+            await asyncio.sleep(min(self.interactive_wait, (1 - self._tokens) / self.refill_rate))
+            self._refill()
+
+        if not self._allowed(priority):
+            self.shed[priority.name.lower()] += 1
+            raise UpstreamBudgetExceeded()
+
+        self._tokens -= 1
+        self.monthly_used += 1
+        self._unsynced += 1
+        self.granted[priority.name.lower()] += 1
+
+    def _can_wait(self) -> bool:
+        return (time.monotonic() >= self._blocked_until
+                and self.monthly_used < self.monthly_quota
+                and (1 - self._tokens) / self.refill_rate <= self.interactive_wait)
+
+    def take_unsynced(self) -> Tuple[str, int]:
+        """The month and the calls spent since the last sync, resetting the count"""
+        self._refill()
+        calls, self._unsynced = self._unsynced, 0
+        return self._month, calls
+
+    def restore_unsynced(self, month: str, calls: int):
+        """Put back calls whose sync failed so the next one carries them"""
+        if month == self._month:
+            self._unsynced += calls
+
+    def synced(self, month: str, total: int):
+        """Adopt the shared count for the month, plus calls made while the sync was in flight"""
+        if month == self._month:
+            self.monthly_used = total + self._unsynced
+
+    def block_for(self, seconds: float):
+        """Stop spending for a while, e.g. after upstream answered 403 quota exceeded"""
+        self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+    def stats(self) -> dict:
+        self._refill()
+        return {
+            "tokens_available": round(self._tokens, 1),
+            "per_minute": int(self.capacity),
+            "monthly_quota": self.monthly_quota,
+            "monthly_used": self.monthly_used,
+            "monthly_remaining": max(self.monthly_quota - self.monthly_used, 0),
+            "blocked_for_s": round(max(self._blocked_until - time.monotonic(), 0), 1),
+            "granted": dict(self.granted),
+            "shed": dict(self.shed),
+        }
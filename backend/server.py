@@ -1,6 +1,7 @@
 from fastapi import FastAPI, APIRouter, HTTPException, Depends, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from pydantic import ValidationError
 from dotenv import load_dotenv
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
@@ -8,11 +9,14 @@ import logging
 from pathlib import Path
 from typing import List, Optional
 import uuid
+import hashlib
+import math
 from datetime import datetime
 
 from models import (
     WeatherResponse, WeatherRequest, SearchHistory, SearchHistoryCreate,
-    CitySearchResult, ErrorResponse
+    CitySearchResult, ErrorResponse, BatchWeatherRequest, BatchWeatherResult,
+    BatchWeatherResponse, AnalyticsRequest
 )
 
 # Load environment variables FIRST
@@ -21,6 +25,18 @@ load_dotenv(ROOT_DIR / '.env')
 
 # Import weather service AFTER loading env vars
 from weather_service import get_weather_service
+from history_writer import HistoryWriter
+from popularity import PopularityTracker, WINDOWS as POPULARITY_WINDOWS
+from quota_usage import QuotaUsageSync
+from history_indexes import ensure_history_indexes, history_collection_report
+from projection import resolve_projection, project_weather
+from analytics import compute_analytics
+from health import HealthProber
+from hot_cities import HotCityRefresher
+from shared_cache import FileCache, MongoCache, SharedCacheChain
+from metrics import REGISTRY, CallbackMetric, MetricsMiddleware, stage
+from live_updates import LiveWeatherHub
+from circuit_breaker import CircuitOpenError
 
 # Create the main app
 app = FastAPI(title="Weather Dashboard API", version="1.0.0")
@@ -32,6 +48,14 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
+)
+
+# Request latency, in-flight gauge and per-stage breakdowns for /metrics (plus an optional slow-request log)
+app.add_middleware(
+    MetricsMiddleware,
+    slow_threshold=float(os.environ.get('SLOW_REQUEST_THRESHOLD_MS', '0')) / 1000,
+    slow_sample_rate=float(os.environ.get('SLOW_REQUEST_SAMPLE_RATE', '1.0')),
 )
 
 # Create a router with the /api prefix
@@ -59,10 +83,173 @@ if not db_name:
 
 db = client[db_name]
 
+# Search history is written behind the response in batches
+history_writer = HistoryWriter(
+    db.search_history,
+    batch_size=int(os.environ.get('HISTORY_BATCH_SIZE', '200')),
+    flush_interval=float(os.environ.get('HISTORY_FLUSH_INTERVAL', '2')),
+    max_buffer=int(os.environ.get('HISTORY_MAX_BUFFER', '10000')),
+    overflow_policy=os.environ.get('HISTORY_OVERFLOW_POLICY', 'drop_oldest'),
+)
+
+# Popularity counters maintained alongside search history writes
+popularity_tracker = PopularityTracker(
+    db,
+    flush_interval=float(os.environ.get('POPULARITY_FLUSH_INTERVAL', '10')),
+)
+
+# Upstream monthly call count shared by all workers and kept across restarts
+quota_usage = QuotaUsageSync(
+    weather_service.upstream_budget,
+    db.upstream_quota_usage,
+    sync_interval=float(os.environ.get('WEATHER_API_QUOTA_SYNC_INTERVAL', '30')),
+)
+
+def build_shared_cache() -> Optional[SharedCacheChain]:
+    """Second-tier weather cache from WEATHER_SHARED_CACHE: file, mongo or both (file,mongo)"""
+    tiers = []
+    for name in os.environ.get('WEATHER_SHARED_CACHE', '').split(','):
+        name = name.strip().lower()
+        if name == 'file':
+            tiers.append(FileCache(
+                os.environ.get('WEATHER_SHARED_CACHE_DIR'),
+                max_bytes=int(os.environ.get('WEATHER_SHARED_CACHE_MAX_BYTES', str(256 * 1024 * 1024))),
+                sweep_interval=float(os.environ.get('WEATHER_SHARED_CACHE_SWEEP_INTERVAL', '60')),
+            ))
+        elif name == 'mongo':
+            tiers.append(MongoCache(db.weather_cache))
+        elif name:
+            logger.warning(f"Ignoring unknown shared cache tier: {name}")
+    return SharedCacheChain(tiers) if tiers else None
+
+weather_service.shared_cache = build_shared_cache()
+
+# Keep the most searched cities warm in the weather cache
+HOT_CITIES_ENABLED = os.environ.get('HOT_CITIES_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+HOT_CITIES_WINDOW = os.environ.get('HOT_CITIES_WINDOW', 'day')
+
+async def load_hot_cities(limit: int) -> List[str]:
+    return [city["city_name"] for city in await popularity_tracker.top(limit, window=HOT_CITIES_WINDOW)]
+
+hot_city_refresher = HotCityRefresher(
+    weather_service,
+    load_hot_cities,
+    top_n=int(os.environ.get('HOT_CITIES_TOP_N', '50')),
+    lead=float(os.environ.get('HOT_CITIES_REFRESH_LEAD', '60')),
+    days=int(os.environ.get('HOT_CITIES_DAYS', '7')),  # what the dashboard requests
+    reload_interval=float(os.environ.get('HOT_CITIES_RELOAD_INTERVAL', '300')),
+)
+
+# One poller per subscribed location pushes current weather to every open dashboard
+live_hub = LiveWeatherHub(
+    weather_service,
+    min_interval=float(os.environ.get('LIVE_MIN_INTERVAL', '15')),
+    max_interval=float(os.environ.get('LIVE_MAX_INTERVAL', '300')),
+)
+LIVE_MAX_LOCATIONS = int(os.environ.get('LIVE_MAX_LOCATIONS', '10'))
+LIVE_MAX_SUBSCRIBERS = int(os.environ.get('LIVE_MAX_SUBSCRIBERS', '1000'))
+LIVE_KEEPALIVE = float(os.environ.get('LIVE_KEEPALIVE', '15'))
+
+async def ping_database():
+    await db.command("ping")
+
+# Dependency checks run in the background so health routes never call upstream or Mongo themselves
+health_probe_interval = float(os.environ.get('HEALTH_PROBE_INTERVAL', '15'))
+health_prober = HealthProber(
+    checks={
+        "weather_api": lambda: weather_service.probe_upstream(max_age=health_probe_interval),
+        "database": ping_database,
+    },
+    interval=health_probe_interval,
+    timeout=float(os.environ.get('HEALTH_PROBE_TIMEOUT', '3')),
+)
+# Checks that must pass for /health/ready; upstream is left out by default since cached data can still be served
+READINESS_CHECKS = [name.strip() for name in os.environ.get('HEALTH_READY_CHECKS', 'database').split(',') if name.strip()]
+
+# Existing service counters, read only when /metrics is scraped
+for name, description, read, kind in [
+    ("weather_cache_entries", "Entries in the in-process weather cache", lambda: weather_service.cache.stats()["entries"], "gauge"),
+    ("weather_cache_bytes", "Approximate size of the in-process weather cache", lambda: weather_service.cache.total_bytes, "gauge"),
+    ("weather_cache_hits_total", "Fresh weather cache hits", lambda: weather_service.cache.hits, "counter"),
+    ("weather_cache_stale_hits_total", "Stale weather cache hits", lambda: weather_service.cache.stale_hits, "counter"),
+    ("weather_cache_misses_total", "Weather cache misses", lambda: weather_service.cache.misses, "counter"),
+    ("weather_upstream_budget_tokens", "Upstream calls available in the rate bucket",
+     lambda: weather_service.upstream_budget.stats()["tokens_available"], "gauge"),
+    ("weather_circuit_open", "1 while the upstream circuit breaker is not closed",
+     lambda: int(weather_service.breaker.state != "closed"), "gauge"),
+    ("live_subscribers", "Open live weather streams", lambda: live_hub.subscribers, "gauge"),
+    ("live_locations", "Locations with a live update poller", lambda: live_hub.stats()["locations"], "gauge"),
+    ("history_writer_buffered", "Search history records waiting to be written", lambda: history_writer.stats()["buffered"], "gauge"),
+    ("history_writer_dropped_total", "Search history records dropped on overflow", lambda: history_writer.dropped, "counter"),
+]:
+    REGISTRY.register(CallbackMetric(name, description, read, kind))
+
+# Maximum number of locations accepted by /weather/batch
+MAX_BATCH_ITEMS = int(os.environ.get('WEATHER_BATCH_MAX_ITEMS', '200'))
+
 # Helper function to get client IP
 def get_client_ip(request: Request) -> str:
     return request.client.host if request.client else "unknown"
 
+def circuit_open_error(error: CircuitOpenError) -> HTTPException:
+    """503 telling the client when upstream will be tried again"""
+    return HTTPException(status_code=503, detail={
+        "error": "api_error",
+        "message": str(error)
+    }, headers={"Retry-After": str(max(math.ceil(error.retry_in), 1))})
+
+def weather_json(weather_data: WeatherResponse) -> Response:
+    """Emit pre-serialized JSON, skipping FastAPI's response_model re-validation pass"""
+    return Response(content=weather_service.render_json(weather_data), media_type="application/json")
+
+def weather_etag(weather_data: WeatherResponse, request: Request) -> str:
+    """Strong ETag from the resolved location, upstream last_updated and the requested representation"""
+    location = weather_data.location
+    variant = request.url.path + "?" + "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+    source = (f"{location.name}|{location.region}|{location.country}|{location.lat}|{location.lon}|"
+              f"{weather_data.current.last_updated}|{variant}")
+    return '"' + hashlib.sha1(source.encode()).hexdigest()[:32] + '"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    # If-None-Match uses weak comparison, so W/ prefixes added by proxies still match
+    return "*" in tags or etag in (tag[2:] if tag.startswith("W/") else tag for tag in tags)
+
+def conditional_weather_response(weather_data: WeatherResponse, request: Request, max_age: int,
+                                 projection: Optional[dict] = None) -> Response:
+    """Weather JSON with ETag and Cache-Control headers, or an empty 304 when the client's copy is current"""
+    etag = weather_etag(weather_data, request)
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={max_age}"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    if projection:
+        with stage("serialize"):
+            response = JSONResponse(content=project_weather(weather_data, projection))
+    else:
+        response = weather_json(weather_data)
+    response.headers.update(headers)
+    return response
+
+async def record_search(weather_data: WeatherResponse, user_ip: str):
+    """Queue a search history record for the background writer"""
+    search_history = SearchHistoryCreate(
+        city_name=weather_data.location.name,
+        country=weather_data.location.country,
+        region=weather_data.location.region,
+        latitude=weather_data.location.lat,
+        longitude=weather_data.location.lon,
+        user_ip=user_ip
+    )
+
+    with stage("history"):
+        history_obj = SearchHistory(**search_history.dict())
+        await history_writer.add(history_obj.dict())
+        popularity_tracker.record(
+            history_obj.city_name, history_obj.country, history_obj.region, history_obj.search_timestamp)
+        weather_service.city_index.record_popularity(history_obj.city_name, history_obj.region, history_obj.country)
+
 # Weather endpoints
 @api_router.get("/", tags=["Health"])
 async def root():
@@ -76,43 +263,12 @@ async def get_current_weather(city: str, request: Request):
         weather_data = await weather_service.get_current_weather(city)
         
         # Save search history
-        search_history = SearchHistoryCreate(
-            city_name=weather_data.location.name,
-            country=weather_data.location.country,
-            region=weather_data.location.region,
-            latitude=weather_data.location.lat,
-            longitude=weather_data.location.lon,
-            user_ip=get_client_ip(request)
-        )
+        await record_search(weather_data, get_client_ip(request))
         
-        history_dict = search_history.dict()
-        history_obj = SearchHistory(**history_dict)
-        await db.search_history.insert_one(history_obj.dict())
-        
-        return weather_data
+        return conditional_weather_response(weather_data, request, weather_service.http_max_age(city))
         
     except ValueError as e:
-        error_msg = str(e)
-        if "not found" in error_msg:
-            raise HTTPException(status_code=404, detail={
-                "error": "city_not_found",
-                "message": error_msg
-            })
-        elif "Network connection failed" in error_msg:
-            raise HTTPException(status_code=503, detail={
-                "error": "network_error",
-                "message": error_msg
-            })
-        elif "Invalid API key" in error_msg or "exceeded quota" in error_msg:
-            raise HTTPException(status_code=503, detail={
-                "error": "api_error",
-                "message": "Weather service temporarily unavailable"
-            })
-        else:
-            raise HTTPException(status_code=500, detail={
-                "error": "api_error",
-                "message": error_msg
-            })
+        raise weather_http_error(e)
     except Exception as e:
         logger.error(f"Unexpected error in get_current_weather: {e}")
         raise HTTPException(status_code=500, detail={
@@ -120,9 +276,21 @@ async def get_current_weather(city: str, request: Request):
             "message": "Internal server error"
         })
 
+def get_projection(view: Optional[str], hours: bool, fields: Optional[List[str]]) -> Optional[dict]:
+    try:
+        return resolve_projection(view, hours, fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail={
+            "error": "invalid_parameter",
+            "message": str(e)
+        })
+
 @api_router.get("/weather/forecast/{city}", response_model=WeatherResponse, tags=["Weather"])
-async def get_weather_forecast(city: str, days: int = 3, request: Request = None):
-    """Get weather forecast for a city"""
+async def get_weather_forecast(city: str, days: int = 3, request: Request = None,
+                               view: Optional[str] = None, hours: bool = True, fields: Optional[str] = None):
+    """Get weather forecast for a city, optionally projected to a view or set of hour fields"""
+    projection = get_projection(view, hours, fields.split(",") if fields else None)
+
     try:
         # Validate days parameter
         if days < 1 or days > 10:
@@ -136,43 +304,15 @@ async def get_weather_forecast(city: str, days: int = 3, request: Request = None
         
         # Save search history
         if request:
-            search_history = SearchHistoryCreate(
-                city_name=forecast_data.location.name,
-                country=forecast_data.location.country,
-                region=forecast_data.location.region,
-                latitude=forecast_data.location.lat,
-                longitude=forecast_data.location.lon,
-                user_ip=get_client_ip(request)
-            )
-            
-            history_dict = search_history.dict()
-            history_obj = SearchHistory(**history_dict)
-            await db.search_history.insert_one(history_obj.dict())
+            await record_search(forecast_data, get_client_ip(request))
         
-        return forecast_data
+        if request is None:
+            return JSONResponse(content=project_weather(forecast_data, projection)) if projection else weather_json(forecast_data)
+        return conditional_weather_response(
+            forecast_data, request, weather_service.http_max_age(city, days), projection)
         
     except ValueError as e:
-        error_msg = str(e)
-        if "not found" in error_msg:
-            raise HTTPException(status_code=404, detail={
-                "error": "city_not_found",
-                "message": error_msg
-            })
-        elif "Network connection failed" in error_msg:
-            raise HTTPException(status_code=503, detail={
-                "error": "network_error",
-                "message": error_msg
-            })
-        elif "Invalid API key" in error_msg or "exceeded quota" in error_msg:
-            raise HTTPException(status_code=503, detail={
-                "error": "api_error",
-                "message": "Weather service temporarily unavailable"
-            })
-        else:
-            raise HTTPException(status_code=500, detail={
-                "error": "api_error",
-                "message": error_msg
-            })
+        raise weather_http_error(e)
     except Exception as e:
         logger.error(f"Unexpected error in get_weather_forecast: {e}")
         raise HTTPException(status_code=500, detail={
@@ -183,6 +323,8 @@ async def get_weather_forecast(city: str, days: int = 3, request: Request = None
 @api_router.post("/weather", response_model=WeatherResponse, tags=["Weather"])
 async def get_weather(weather_request: WeatherRequest, request: Request):
     """Get weather data (current + forecast) for a city"""
+    projection = get_projection(weather_request.view, weather_request.hours, weather_request.fields)
+
     try:
         # Get comprehensive weather data
         weather_data = await weather_service.get_weather_forecast(
@@ -191,43 +333,129 @@ async def get_weather(weather_request: WeatherRequest, request: Request):
         )
         
         # Save search history
-        search_history = SearchHistoryCreate(
-            city_name=weather_data.location.name,
-            country=weather_data.location.country,
-            region=weather_data.location.region,
-            latitude=weather_data.location.lat,
-            longitude=weather_data.location.lon,
-            user_ip=get_client_ip(request)
-        )
-        
-        history_dict = search_history.dict()
-        history_obj = SearchHistory(**history_dict)
-        await db.search_history.insert_one(history_obj.dict())
+        await record_search(weather_data, get_client_ip(request))
         
-        return weather_data
+        if projection:
+            with stage("serialize"):
+                return JSONResponse(content=project_weather(weather_data, projection))
+        return weather_json(weather_data)
         
     except ValueError as e:
-        error_msg = str(e)
-        if "not found" in error_msg:
-            raise HTTPException(status_code=404, detail={
-                "error": "city_not_found",
-                "message": error_msg
-            })
-        elif "Network connection failed" in error_msg:
-            raise HTTPException(status_code=503, detail={
-                "error": "network_error",
-                "message": error_msg
-            })
-        elif "Invalid API key" in error_msg or "exceeded quota" in error_msg:
-            raise HTTPException(status_code=503, detail={
-                "error": "api_error",
-                "message": "Weather service temporarily unavailable"
-            })
+        raise weather_http_error(e)
+
+def weather_error(error: Exception) -> ErrorResponse:
+    """Map a WeatherService error onto the error codes used by the weather endpoints"""
+    error_msg = str(error)
+    if not isinstance(error, ValueError):
+        return ErrorResponse(error="server_error", message="Internal server error")
+    if isinstance(error, ValidationError):
+        return ErrorResponse(error="invalid_parameter", message="; ".join(
+            f"{'.'.join(map(str, detail['loc'])) or 'item'}: {detail['msg']}" for detail in error.errors()))
+    if isinstance(error, CircuitOpenError):
+        return ErrorResponse(error="api_error", message=error_msg, code="circuit_open")
+    if "not found" in error_msg:
+        return ErrorResponse(error="city_not_found", message=error_msg)
+    if "Network connection failed" in error_msg:
+        return ErrorResponse(error="network_error", message=error_msg)
+    if "Invalid API key" in error_msg or "exceeded quota" in error_msg:
+        return ErrorResponse(error="api_error", message="Weather service temporarily unavailable",
+                             code="upstream_unavailable")
+    return ErrorResponse(error="api_error", message=error_msg)
+
+def weather_error_status(error: ErrorResponse) -> int:
+    if error.error == "invalid_parameter":
+        return 400
+    if error.error == "city_not_found":
+        return 404
+    if error.error == "network_error" or error.code in ("circuit_open", "upstream_unavailable"):
+        return 503
+    return 500
+
+def weather_http_error(error: Exception) -> HTTPException:
+    """HTTPException for a WeatherService error, with the status codes shared by the weather endpoints"""
+    if isinstance(error, CircuitOpenError):
+        return circuit_open_error(error)
+    response = weather_error(error)
+    return HTTPException(status_code=weather_error_status(response), detail=response.dict(exclude_none=True))
+
+@api_router.post("/weather/batch", response_model=BatchWeatherResponse, tags=["Weather"])
+async def get_weather_batch(batch_request: BatchWeatherRequest):
+    """Get weather for many cities or coordinates in one call"""
+    if batch_request.days < 1 or batch_request.days > 10:
+        raise HTTPException(status_code=400, detail={
+            "error": "invalid_parameter",
+            "message": "Days must be between 1 and 10"
+        })
+    if not batch_request.items or len(batch_request.items) > MAX_BATCH_ITEMS:
+        raise HTTPException(status_code=400, detail={
+            "error": "invalid_parameter",
+            "message": f"Batch must contain between 1 and {MAX_BATCH_ITEMS} items"
+        })
+
+    items = batch_request.items
+    results = weather_service.iter_weather_batch(items, batch_request.days)
+
+    def to_result(index: int, outcome) -> BatchWeatherResult:
+        if isinstance(outcome, Exception):
+            return BatchWeatherResult(index=index, query=items[index], error=weather_error(outcome))
+        return BatchWeatherResult(index=index, query=items[index], weather=outcome)
+
+    if batch_request.stream:
+        async def ndjson():
+            async for index, outcome in results:
+                yield to_result(index, outcome).json(exclude_none=True) + "\n"
+
+        return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+    collected = [to_result(index, outcome) async for index, outcome in results]
+    collected.sort(key=lambda result: result.index)
+    failed = sum(1 for result in collected if result.error is not None)
+    return BatchWeatherResponse(results=collected, succeeded=len(collected) - failed, failed=failed)
+
+def validate_analytics_params(days: int, window: int):
+    if days < 1 or days > 10:
+        raise HTTPException(status_code=400, detail={
+            "error": "invalid_parameter",
+            "message": "Days must be between 1 and 10"
+        })
+    if window < 1 or window > 72:
+        raise HTTPException(status_code=400, detail={
+            "error": "invalid_parameter",
+            "message": "Window must be between 1 and 72 hours"
+        })
+
+@api_router.post("/weather/analytics", tags=["Weather"])
+async def get_weather_analytics_batch(analytics_request: AnalyticsRequest):
+    """Derived metrics (dew point, heat index, rolling means, diurnal range, precipitation) for many cities"""
+    validate_analytics_params(analytics_request.days, analytics_request.window)
+    if not analytics_request.cities or len(analytics_request.cities) > MAX_BATCH_ITEMS:
+        raise HTTPException(status_code=400, detail={
+            "error": "invalid_parameter",
+            "message": f"Cities must contain between 1 and {MAX_BATCH_ITEMS} entries"
+        })
+
+    outcomes = await weather_service.get_forecast_columns_many(analytics_request.cities, analytics_request.days)
+    forecasts = [outcome for outcome in outcomes if not isinstance(outcome, Exception)]
+    computed = iter(compute_analytics(forecasts, analytics_request.days, analytics_request.window))
+
+    results = []
+    for city, outcome in zip(analytics_request.cities, outcomes):
+        if isinstance(outcome, Exception):
+            results.append({"query": city, "error": weather_error(outcome).dict()})
         else:
-            raise HTTPException(status_code=500, detail={
-                "error": "api_error",
-                "message": error_msg
-            })
+            results.append({"query": city, **next(computed)})
+    return {"results": results}
+
+@api_router.get("/weather/{city}/analytics", tags=["Weather"])
+async def get_weather_analytics(city: str, days: int = 3, window: int = 3):
+    """Derived metrics computed from the hourly forecast for one city"""
+    validate_analytics_params(days, window)
+
+    try:
+        forecast = await weather_service.get_forecast_columns(city, days)
+    except Exception as e:
+        raise weather_http_error(e)
+    return compute_analytics([forecast], days, window)[0]
 
 @api_router.get("/cities/search", response_model=List[CitySearchResult], tags=["Cities"])
 async def search_cities(q: str):
@@ -246,6 +474,39 @@ async def search_cities(q: str):
         # Return empty list instead of error for search
         return []
 
+@api_router.get("/weather/live", tags=["Weather"])
+async def live_weather(locations: str):
+    """Server-Sent Events stream of current weather for up to LIVE_MAX_LOCATIONS comma-separated locations
+
+    Each location first gets a `snapshot` event with the full response, then
+    `delta` events carrying only the CurrentWeather fields that changed.
+    """
+    requested = [location.strip() for location in locations.split(",") if location.strip()]
+    if not requested or len(requested) > LIVE_MAX_LOCATIONS:
+        raise HTTPException(status_code=400, detail={
+            "error": "invalid_parameter",
+            "message": f"Subscribe to between 1 and {LIVE_MAX_LOCATIONS} locations"
+        })
+    if live_hub.subscribers >= LIVE_MAX_SUBSCRIBERS:
+        raise HTTPException(status_code=503, detail={
+            "error": "server_busy",
+            "message": "Too many live subscriptions, fall back to polling"
+        })
+
+    async def events():
+        # Subscribe only once the response is streaming, so a client gone before then leaks nothing
+        subscription = live_hub.subscribe(requested)
+        try:
+            while True:
+                frame = await subscription.next(LIVE_KEEPALIVE)
+                # Comment lines keep proxies from closing an idle stream
+                yield frame if frame is not None else ": keepalive\n\n"
+        finally:
+            live_hub.unsubscribe(subscription)
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 @api_router.get("/weather/coordinates", response_model=WeatherResponse, tags=["Weather"])
 async def get_weather_by_coordinates(lat: float, lon: float, days: int = 3, request: Request = None):
     """Get weather data by coordinates"""
@@ -261,26 +522,15 @@ async def get_weather_by_coordinates(lat: float, lon: float, days: int = 3, requ
         
         # Save search history
         if request:
-            search_history = SearchHistoryCreate(
-                city_name=weather_data.location.name,
-                country=weather_data.location.country,
-                region=weather_data.location.region,
-                latitude=weather_data.location.lat,
-                longitude=weather_data.location.lon,
-                user_ip=get_client_ip(request)
-            )
-            
-            history_dict = search_history.dict()
-            history_obj = SearchHistory(**history_dict)
-            await db.search_history.insert_one(history_obj.dict())
+            await record_search(weather_data, get_client_ip(request))
         
-        return weather_data
+        if request is None:
+            return weather_json(weather_data)
+        query = weather_service.geo_grid.query_for(lat, lon, count=False)
+        return conditional_weather_response(weather_data, request, weather_service.http_max_age(query, days))
         
     except ValueError as e:
-        raise HTTPException(status_code=500, detail={
-            "error": "api_error",
-            "message": str(e)
-        })
+        raise weather_http_error(e)
 
 # Search history endpoints
 @api_router.get("/history/searches", response_model=List[SearchHistory], tags=["History"])
@@ -297,37 +547,16 @@ async def get_search_history(limit: int = 50):
         })
 
 @api_router.get("/history/popular", tags=["History"])
-async def get_popular_cities(limit: int = 10):
-    """Get most searched cities"""
+async def get_popular_cities(limit: int = 10, window: Optional[str] = None):
+    """Get most searched cities, optionally within the last hour/day/week"""
+    if window is not None and window not in POPULARITY_WINDOWS:
+        raise HTTPException(status_code=400, detail={
+            "error": "invalid_parameter",
+            "message": f"Window must be one of: {', '.join(POPULARITY_WINDOWS)}"
+        })
+
     try:
-        pipeline = [
-            {
-                "$group": {
-                    "_id": {
-                        "city_name": "$city_name",
-                        "country": "$country",
-                        "region": "$region"
-                    },
-                    "search_count": {"$sum": 1},
-                    "last_searched": {"$max": "$search_timestamp"}
-                }
-            },
-            {"$sort": {"search_count": -1}},
-            {"$limit": limit},
-            {
-                "$project": {
-                    "_id": 0,
-                    "city_name": "$_id.city_name",
-                    "country": "$_id.country",
-                    "region": "$_id.region",
-                    "search_count": 1,
-                    "last_searched": 1
-                }
-            }
-        ]
-        
-        result = await db.search_history.aggregate(pipeline).to_list(limit)
-        return result
+        return await popularity_tracker.top(limit, window)
     except Exception as e:
         logger.error(f"Error fetching popular cities: {e}")
         raise HTTPException(status_code=500, detail={
@@ -335,31 +564,77 @@ async def get_popular_cities(limit: int = 10):
             "message": "Failed to fetch popular cities"
         })
 
+# Admin endpoints
+@api_router.get("/admin/history/stats", tags=["Admin"])
+async def get_history_collection_stats():
+    """Report search_history size and index usage"""
+    try:
+        return await history_collection_report(db)
+    except Exception as e:
+        logger.error(f"Error fetching search history stats: {e}")
+        raise HTTPException(status_code=500, detail={
+            "error": "database_error",
+            "message": "Failed to fetch search history stats"
+        })
+
 # Health check with weather service status
 @api_router.get("/health", tags=["Health"])
 async def health_check():
-    """Health check endpoint"""
-    try:
-        # Test a simple weather API call
-        await weather_service.search_cities("London")
-        return {
-            "status": "healthy",
-            "weather_api": "connected",
-            "database": "connected",
+    """Health check endpoint (reports the background prober's latest results)"""
+    checks = health_prober.results
+    healthy = health_prober.healthy()
+    if health_prober.rounds == 0:
+        status = "starting"
+    else:
+        status = "healthy" if healthy else "degraded"
+    return JSONResponse(
+        status_code=200 if healthy else 503,
+        content={
+            "status": status,
+            "weather_api": "connected" if health_prober.healthy(["weather_api"]) else "disconnected",
+            "database": "connected" if health_prober.healthy(["database"]) else "disconnected",
+            "checks": checks,
+            "prober": health_prober.stats(),
+            "weather_api_pool": weather_service.get_pool_stats(),
+            "weather_cache": weather_service.get_cache_stats(),
+            "shared_cache": weather_service.get_shared_cache_stats(),
+            "cache_snapshot": weather_service.get_snapshot_stats(),
+            "upstream_coalescing": weather_service.get_coalescing_stats(),
+            "upstream_budget": weather_service.get_budget_stats(),
+            "upstream_quota_usage": quota_usage.stats(),
+            "upstream_circuit": weather_service.get_breaker_stats(),
+            "history_writer": history_writer.stats(),
+            "popularity": popularity_tracker.stats(),
+            "hot_cities": hot_city_refresher.stats(),
+            "live_updates": live_hub.stats(),
+            "city_search": weather_service.get_city_search_stats(),
+            "geo_grid": weather_service.get_geo_grid_stats(),
             "timestamp": datetime.utcnow().isoformat()
         }
-    except Exception as e:
-        logger.error(f"Health check failed: {e}")
-        return JSONResponse(
-            status_code=503,
-            content={
-                "status": "degraded",
-                "weather_api": "disconnected",
-                "database": "connected",
-                "error": str(e),
-                "timestamp": datetime.utcnow().isoformat()
-            }
-        )
+    )
+
+@api_router.get("/health/live", tags=["Health"])
+async def liveness_check():
+    """Liveness probe: the process is up and serving requests"""
+    return {"status": "alive", "timestamp": datetime.utcnow().isoformat()}
+
+@api_router.get("/health/ready", tags=["Health"])
+async def readiness_check():
+    """Readiness probe: the checks in HEALTH_READY_CHECKS passed in the latest probe round"""
+    ready = health_prober.healthy(READINESS_CHECKS)
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "status": "ready" if ready else "not_ready",
+            "checks": {name: health_prober.results.get(name) for name in READINESS_CHECKS},
+            "timestamp": datetime.utcnow().isoformat()
+        }
+    )
+
+@app.get("/metrics", tags=["Health"], include_in_schema=False)
+async def metrics():
+    """Prometheus metrics"""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
 
 # Include the router in the main app
 app.include_router(api_router)
@@ -376,6 +651,63 @@ async def global_exception_handler(request: Request, exc: Exception):
         }
     )
 
+@app.on_event("startup")
+async def startup_weather_service():
+    await weather_service.start()
+    if weather_service.shared_cache is not None:
+        await weather_service.shared_cache.start()
+    await weather_service.start_snapshots()
+
+@app.on_event("startup")
+async def startup_history_indexes():
+    retention_days = os.environ.get('HISTORY_RETENTION_DAYS')
+    capped_size_mb = os.environ.get('HISTORY_CAPPED_SIZE_MB')
+    try:
+        await ensure_history_indexes(
+            db,
+            retention_days=float(retention_days) if retention_days else None,
+            capped_size_mb=int(capped_size_mb) if capped_size_mb else None,
+        )
+    except Exception as e:
+        logger.error(f"Failed to provision search history indexes: {e}")
+
+@app.on_event("startup")
+async def startup_history_writer():
+    await history_writer.start()
+
+@app.on_event("startup")
+async def startup_popularity_tracker():
+    try:
+        await popularity_tracker.start()
+        # Rank city autocomplete by what people actually search for
+        weather_service.city_index.load_popularity(await popularity_tracker.top(1000))
+    except Exception as e:
+        logger.error(f"Failed to start popularity tracker: {e}")
+
+@app.on_event("startup")
+async def startup_quota_usage():
+    await quota_usage.start()
+
+@app.on_event("startup")
+async def startup_hot_city_refresher():
+    if HOT_CITIES_ENABLED:
+        await hot_city_refresher.start()
+
+@app.on_event("startup")
+async def startup_health_prober():
+    await health_prober.start()
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    await health_prober.stop()
+    await live_hub.stop()
+    await hot_city_refresher.stop()
+    # Flush buffered search history before the connection goes away
+    await history_writer.stop()
+    await popularity_tracker.stop()
+    await quota_usage.stop()
     client.close()
+
+@app.on_event("shutdown")
+async def shutdown_weather_service():
+    await weather_service.close()
@@ -0,0 +1,211 @@
+import asyncio
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, NamedTuple, Optional
+
+from bson import Binary
+from pymongo import ASCENDING
+
+logger = logging.getLogger(__name__)
+
+class SharedEntry(NamedTuple):
+    """A cached payload with wall-clock expiry, comparable across processes and hosts"""
+    payload: bytes
+    expires_at: float
+    stale_until: float
+
+# tmpfs when available, so the host-local tier lives in memory shared by all workers
+DEFAULT_CACHE_DIR = Path("/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()) / "weather-dashboard-cache"
+
+class FileCache:
+    """Host-local tier: one file per key in a directory shared by every worker on the host
+
+    Entries are written to a temp file and renamed into place, so readers never
+    see a partial entry, and read through mmap straight from the page cache.
+    The directory is swept at startup and then at most every sweep_interval
+    seconds on write: entries past their stale window are removed, then the
+    ones closest to going stale until the directory fits in max_bytes (the
+    default directory is RAM-backed).
+    """
+
+    name = "file"
+    _header = struct.Struct("<dd")
+
+    def __init__(self, directory: Optional[str] = None, max_bytes: int = 256 * 1024 * 1024,
+                 sweep_interval: float = 60):
+        self.directory = Path(directory) if directory else DEFAULT_CACHE_DIR
+        self.max_bytes = max_bytes
+        self.sweep_interval = sweep_interval
+        self._last_sweep = time.monotonic()
+        self.swept = 0
+        self.evicted = 0
+
+    def _path(self, key: str) -> Path:
+        return self.directory / hashlib.sha1(key.encode()).hexdigest()
+
+    async def start(self):
+        await asyncio.to_thread(self._prune)
+
+    def _prune(self):
+        """Create the directory, drop entries past their stale window and evict down to max_bytes"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._last_sweep = time.monotonic()
+        now = time.time()
+        live = []
+        total = 0
+        for path in self.directory.iterdir():
+            try:
+                stat = path.stat()
+                if path.suffix == ".tmp":
+                    # Left behind by a writer that died before renaming it into place
+                    if now - stat.st_mtime > 60:
+                        path.unlink()
+                    continue
+                with open(path, "rb") as f:
+                    _, stale_until = self._header.unpack(f.read(self._header.size))
+                if now >= stale_until:
+                    path.unlink()
+                    self.swept += 1
+                    continue
+            except (OSError, struct.error):
+                continue
+            live.append((stale_until, stat.st_size, path))
+            total += stat.st_size
+
+        for _, size, path in sorted(live):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            self.evicted += 1
+
+    async def get(self, key: str) -> Optional[SharedEntry]:
+        return await asyncio.to_thread(self._read, key)
+
+    def _read(self, key: str) -> Optional[SharedEntry]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                expires_at, stale_until = self._header.unpack_from(mm, 0)
+                if time.time() >= stale_until:
+                    path.unlink(missing_ok=True)
+                    return None
+                return SharedEntry(mm[self._header.size:], expires_at, stale_until)
+        except FileNotFoundError:
+            return None
+
+    async def set(self, key: str, entry: SharedEntry):
+        await asyncio.to_thread(self._write, key, entry)
+
+    def _write(self, key: str, entry: SharedEntry):
+        path = self._path(key)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            f.write(self._header.pack(entry.expires_at, entry.stale_until))
+            f.write(entry.payload)
+        os.replace(tmp, path)
+        if time.monotonic() - self._last_sweep >= self.sweep_interval:
+            self._prune()
+
+    def stats(self) -> dict:
+        return {"max_bytes": self.max_bytes, "swept": self.swept, "evicted": self.evicted}
+
+class MongoCache:
+    """Cross-host tier in a Mongo collection, expired by a TTL index on stale_until"""
+
+    name = "mongo"
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def start(self):
+        await self.collection.create_index([("stale_until", ASCENDING)], expireAfterSeconds=0)
+
+    @staticmethod
+    def _to_datetime(timestamp: float) -> datetime:
+        return datetime.utcfromtimestamp(timestamp)
+
+    @staticmethod
+    def _to_timestamp(value: datetime) -> float:
+        return value.replace(tzinfo=timezone.utc).timestamp()
+
+    async def get(self, key: str) -> Optional[SharedEntry]:
+        doc = await self.collection.find_one({"_id": key})
+        if doc is None:
+            return None
+        # The TTL monitor only runs once a minute, so check expiry here too
+        stale_until = self._to_timestamp(doc["stale_until"])
+        if time.time() >= stale_until:
+            return None
+        return SharedEntry(bytes(doc["payload"]), self._to_timestamp(doc["expires_at"]), stale_until)
+
+    async def set(self, key: str, entry: SharedEntry):
+        await self.collection.replace_one({"_id": key}, {
+            "payload": Binary(entry.payload),
+            "expires_at": self._to_datetime(entry.expires_at),
+            "stale_until": self._to_datetime(entry.stale_until),
+        }, upsert=True)
+
+class SharedCacheChain:
+    """Ordered second-tier caches (e.g. file then mongo) behind the in-process cache
+
+    A hit in a later tier is copied into the earlier ones; writes go to every
+    tier. Tier errors are logged and counted, never raised.
+    """
+
+    def __init__(self, tiers: List):
+        self.tiers = tiers
+        self._stats = {tier.name: {"hits": 0, "misses": 0, "writes": 0, "errors": 0} for tier in tiers}
+
+    async def start(self):
+        for tier in self.tiers:
+            try:
+                await tier.start()
+            except Exception as e:
+                logger.error(f"Failed to start {tier.name} cache tier: {e}")
+
+    async def get(self, key: str, min_fresh: float = float("-inf")) -> Optional[SharedEntry]:
+        """First entry that stays fresh for at least min_fresh seconds (negative accepts stale ones)"""
+        for index, tier in enumerate(self.tiers):
+            counters = self._stats[tier.name]
+            try:
+                entry = await tier.get(key)
+            except Exception as e:
+                logger.warning(f"{tier.name} cache read failed for {key}: {e}")
+                counters["errors"] += 1
+                continue
+            if entry is None or entry.expires_at - time.time() < min_fresh:
+                # A later tier may hold a newer copy written by another host
+                counters["misses"] += 1
+                continue
+            counters["hits"] += 1
+            for earlier in self.tiers[:index]:
+                await self._set_tier(earlier, key, entry)
+            return entry
+        return None
+
+    async def set(self, key: str, entry: SharedEntry):
+        for tier in self.tiers:
+            await self._set_tier(tier, key, entry)
+
+    async def _set_tier(self, tier, key: str, entry: SharedEntry):
+        try:
+            await tier.set(key, entry)
+            self._stats[tier.name]["writes"] += 1
+        except Exception as e:
+            logger.warning(f"{tier.name} cache write failed for {key}: {e}")
+            self._stats[tier.name]["errors"] += 1
+
+    def stats(self) -> dict:
+        stats = {name: dict(counters) for name, counters in self._stats.items()}
+        for tier in self.tiers:
+            if hasattr(tier, "stats"):
+                stats[tier.name].update(tier.stats())
+        return stats
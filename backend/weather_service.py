@@ -1,11 +1,348 @@
 import aiohttp
+import asyncio
+import json
 import os
-from typing import List, Optional
-from models import WeatherResponse, CitySearchResult, ErrorResponse
+import re
+import tempfile
+import time
+from collections import Counter, OrderedDict
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple, Union
+from models import WeatherResponse, Forecast, CitySearchResult, ErrorResponse, BatchWeatherItem
+from city_index import CityIndex
+from columnar import CompactForecast
+from rate_limiter import Priority, QuotaBudget, UpstreamBudgetExceeded, priority_scope
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from shared_cache import SharedCacheChain, SharedEntry
+from cache_snapshot import CacheSnapshot
+from geo_grid import GeoGrid
+from metrics import UPSTREAM_IN_FLIGHT, UPSTREAM_RESPONSES, stage
 import logging
 
 logger = logging.getLogger(__name__)
 
+class PoolStats:
+    """Connection pool counters fed by aiohttp trace hooks"""
+
+    def __init__(self):
+        self.requests = 0
+        self.in_flight = 0
+        self.connections_created = 0
+        self.connections_reused = 0
+        self.queued = 0
+        self.queue_wait_total = 0.0
+        self.queue_wait_max = 0.0
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(self._on_request_start)
+        trace_config.on_request_end.append(self._on_request_done)
+        trace_config.on_request_exception.append(self._on_request_done)
+        trace_config.on_connection_create_end.append(self._on_connection_create)
+        trace_config.on_connection_reuseconn.append(self._on_connection_reuse)
+        trace_config.on_connection_queued_start.append(self._on_queued_start)
+        trace_config.on_connection_queued_end.append(self._on_queued_end)
+        return trace_config
+
+    async def _on_request_start(self, session, ctx, params):
+        self.requests += 1
+        self.in_flight += 1
+
+    async def _on_request_done(self, session, ctx, params):
+        self.in_flight -= 1
+
+    async def _on_connection_create(self, session, ctx, params):
+        self.connections_created += 1
+
+    async def _on_connection_reuse(self, session, ctx, params):
+        self.connections_reused += 1
+
+    async def _on_queued_start(self, session, ctx, params):
+        ctx.queued_at = time.perf_counter()
+
+    async def _on_queued_end(self, session, ctx, params):
+        waited = time.perf_counter() - ctx.queued_at
+        self.queued += 1
+        self.queue_wait_total += waited
+        self.queue_wait_max = max(self.queue_wait_max, waited)
+
+    def snapshot(self, connector: Optional[aiohttp.TCPConnector] = None) -> dict:
+        acquired = self.connections_created + self.connections_reused
+        return {
+            "requests": self.requests,
+            "in_flight": self.in_flight,
+            "active_connections": len(connector._acquired) if connector and not connector.closed else 0,
+            "connections_created": self.connections_created,
+            "connections_reused": self.connections_reused,
+            "reuse_ratio": round(self.connections_reused / acquired, 3) if acquired else 0.0,
+            "queued": self.queued,
+            "queue_wait_avg_ms": round(self.queue_wait_total / self.queued * 1000, 2) if self.queued else 0.0,
+            "queue_wait_max_ms": round(self.queue_wait_max * 1000, 2),
+        }
+
+class CacheEntry:
+    __slots__ = ("value", "size", "expires_at", "stale_until", "derived")
+
+    def __init__(self, value: Any, size: int, expires_at: float, stale_until: float):
+        self.value = value
+        self.size = size
+        self.expires_at = expires_at
+        self.stale_until = stale_until
+        # Slices, serialized bodies etc. built from the value, keyed by (id(source), variant)
+        self.derived: Dict[Tuple[int, Any], Any] = {}
+
+class ResponseCache:
+    """In-process LRU cache with per-entry TTL, a memory cap and a stale window"""
+
+    def __init__(self, max_entries: int = 2000, max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        # id of every cached value and everything derived from it -> (object, cache key)
+        self._owners: Dict[int, Tuple[Any, str]] = {}
+        self.total_bytes = 0
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Tuple[Optional[Any], bool]:
+        """Return (value, is_fresh); value is None on a miss or once the stale window has passed"""
+        entry = self._entries.get(key)
+        now = time.monotonic()
+        if entry is None or now >= entry.stale_until:
+            # Expired entries stay until evicted so last_known() can still shed load onto them
+            self.misses += 1
+            return None, False
+
+        self._entries.move_to_end(key)
+        if now < entry.expires_at:
+            self.hits += 1
+            return entry.value, True
+        self.stale_hits += 1
+        return entry.value, False
+
+    def expires_in(self, key: str) -> Optional[float]:
+        """Seconds until an entry stops being fresh (negative once stale), None if absent; not counted as a lookup"""
+        entry = self._entries.get(key)
+        return entry.expires_at - time.monotonic() if entry is not None else None
+
+    def last_known(self, key: str) -> Optional[Any]:
+        """Most recent value for a key regardless of age, for when upstream must not be called"""
+        entry = self._entries.get(key)
+        return entry.value if entry is not None else None
+
+    def items(self, limit: Optional[int] = None) -> List[Tuple[str, Any, float, float]]:
+        """(key, value, seconds until expiry, seconds until stale window ends), most recently used first"""
+        now = time.monotonic()
+        items = []
+        for key, entry in reversed(self._entries.items()):
+            if limit is not None and len(items) >= limit:
+                break
+            if now < entry.stale_until:
+                items.append((key, entry.value, entry.expires_at - now, entry.stale_until - now))
+        return items
+
+    def set(self, key: str, value: Any, size: int, ttl: float, stale_ttl: float = 0):
+        if key in self._entries:
+            self._remove(key)
+        now = time.monotonic()
+        self._entries[key] = CacheEntry(value, size, now + ttl, now + ttl + stale_ttl)
+        self._owners[id(value)] = (value, key)
+        self.total_bytes += size
+        self._evict()
+
+    def derive(self, source: Any, variant: Any, build: Callable[[], Any],
+               size: Optional[Callable[[Any], int]] = None) -> Any:
+        """Memoize build() on the entry that source (a cached value or something derived from one) belongs to
+
+        The result is charged size(result) bytes and dropped together with the
+        entry when it is evicted or replaced. Sources that are not in the cache
+        are not memoized.
+        """
+        owner = self._owners.get(id(source))
+        if owner is None or owner[0] is not source:
+            return build()
+        key = owner[1]
+        entry = self._entries[key]
+        memo_key = (id(source), variant)
+        if memo_key in entry.derived:
+            return entry.derived[memo_key]
+
+        value = build()
+        entry.derived[memo_key] = value
+        self._owners.setdefault(id(value), (value, key))
+        charge = size(value) if size is not None else 0
+        entry.size += charge
+        self.total_bytes += charge
+        self._evict()
+        return value
+
+    def _evict(self):
+        # Evict least recently used entries until we are back under both caps
+        while self._entries and (len(self._entries) > self.max_entries or self.total_bytes > self.max_bytes):
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key)
+        self.total_bytes -= entry.size
+        for obj in [entry.value, *entry.derived.values()]:
+            owner = self._owners.get(id(obj))
+            if owner is not None and owner[0] is obj and owner[1] == key:
+                del self._owners[id(obj)]
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round((self.hits + self.stale_hits) / lookups, 3) if lookups else 0.0,
+        }
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key into one shared upstream call"""
+
+    def __init__(self, max_tracked_keys: int = 1000):
+        self.max_tracked_keys = max_tracked_keys
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.calls = 0
+        self.deduplicated = 0
+        self.deduplicated_by_key: Counter = Counter()
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is not None:
+            self.deduplicated += 1
+            self.deduplicated_by_key[key] += 1
+            if len(self.deduplicated_by_key) > self.max_tracked_keys:
+                self.deduplicated_by_key = Counter(dict(self.deduplicated_by_key.most_common(self.max_tracked_keys // 2)))
+        else:
+            self.calls += 1
+            task = asyncio.create_task(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+
+        # Shield so one cancelled caller does not cancel the fetch for everyone else
+        return await asyncio.shield(task)
+
+    def _done(self, key: str, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the exception as retrieved even if every waiter was cancelled
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self, top: int = 10) -> dict:
+        return {
+            "upstream_calls": self.calls,
+            "deduplicated": self.deduplicated,
+            "in_flight": len(self._inflight),
+            "top_deduplicated_keys": dict(self.deduplicated_by_key.most_common(top)),
+        }
+
+class SearchPrefixCache:
+    """LRU of city search query -> results that can answer longer queries by narrowing
+
+    A cached result list is complete when upstream returned fewer than its
+    result cap, so every match for a longer query sharing that prefix must
+    already be in it.
+    """
+
+    def __init__(self, ttl: float = 86400, max_entries: int = 5000, upstream_limit: int = 10):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.upstream_limit = upstream_limit
+        self._entries: "OrderedDict[str, Tuple[float, List[CitySearchResult]]]" = OrderedDict()
+        self.exact_hits = 0
+        self.prefix_hits = 0
+        self.misses = 0
+
+    def _lookup(self, key: str) -> Optional[List[CitySearchResult]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, results = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return results
+
+    def get(self, query: str) -> Optional[List[CitySearchResult]]:
+        key = normalize_location(query)
+        results = self._lookup(key)
+        if results is not None:
+            self.exact_hits += 1
+            return results
+
+        # Walk back through shorter prefixes looking for a complete result set; a "city, region"
+        # qualifier is matched by upstream in ways a prefix filter cannot reproduce
+        if "," not in key:
+            for end in range(len(key) - 1, 1, -1):
+                results = self._lookup(key[:end])
+                if results is not None and len(results) < self.upstream_limit:
+                    narrowed = [city for city in results if self._matches(city, key)]
+                    if narrowed:
+                        self.prefix_hits += 1
+                        return narrowed
+                    # Nothing left to show, so let upstream (or the local index) answer instead
+                    break
+
+        self.misses += 1
+        return None
+
+    @staticmethod
+    def _matches(city: CitySearchResult, key: str) -> bool:
+        """Whether the query starts any word of the city's name, region or country, as upstream matches"""
+        text = normalize_location(f"{city.name} {city.region} {city.country}")
+        return text.startswith(key) or f" {key}" in text
+
+    def set(self, query: str, results: List[CitySearchResult], ttl: Optional[float] = None):
+        key = normalize_location(query)
+        self._entries[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), results)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def items(self) -> List[Tuple[str, float, List[CitySearchResult]]]:
+        """(normalized query, seconds until expiry, results) for unexpired entries"""
+        now = time.monotonic()
+        return [(key, expires_at - now, results) for key, (expires_at, results) in self._entries.items() if expires_at > now]
+
+    def stats(self) -> dict:
+        lookups = self.exact_hits + self.prefix_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "exact_hits": self.exact_hits,
+            "prefix_hits": self.prefix_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.exact_hits + self.prefix_hits) / lookups, 3) if lookups else 0.0,
+        }
+
+# Survives worker restarts on the host and is shared (merged under a lock) by all workers of the app;
+# point WEATHER_CACHE_SNAPSHOT at a volume to survive redeploys
+DEFAULT_SNAPSHOT_PATH = Path(tempfile.gettempdir()) / "weather-dashboard-cache.snapshot"
+
+# Parsed pydantic models hold ~3.2x their JSON size plus a fixed overhead (measured with tracemalloc
+# on the recorded 10-day forecast and current payloads)
+PARSED_BYTES_PER_JSON_BYTE = 3.2
+PARSED_BASE_BYTES = 3072
+
+def parsed_size(body: bytes) -> int:
+    """Approximate memory retained by a WeatherResponse parsed from body, for the cache's byte cap"""
+    return int(len(body) * PARSED_BYTES_PER_JSON_BYTE) + PARSED_BASE_BYTES
+
+def normalize_location(location: str) -> str:
+    """Normalize a user-supplied location so equivalent queries share a cache key"""
+    return re.sub(r"\s+", " ", location.strip().lower())
+
 class WeatherService:
     def __init__(self):
         self.api_key = os.environ.get('WEATHER_API_KEY')
@@ -14,9 +351,521 @@ class WeatherService:
         if not self.api_key:
             raise ValueError("WEATHER_API_KEY environment variable is required")
 
+        # Connection pool settings for the shared upstream session
+        self.pool_size = int(os.environ.get('WEATHER_API_POOL_SIZE', '100'))
+        self.keepalive_timeout = float(os.environ.get('WEATHER_API_KEEPALIVE', '30'))
+        self.dns_cache_ttl = int(os.environ.get('WEATHER_API_DNS_TTL', '300'))
+
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._connector: Optional[aiohttp.TCPConnector] = None
+        self.pool_stats = PoolStats()
+
+        # Response cache settings (TTLs in seconds, WeatherAPI refreshes roughly every 15 minutes)
+        self.current_ttl = float(os.environ.get('WEATHER_CACHE_TTL_CURRENT', '300'))
+        self.forecast_ttl = float(os.environ.get('WEATHER_CACHE_TTL_FORECAST', '900'))
+        self.stale_ttl = float(os.environ.get('WEATHER_CACHE_STALE_TTL', '600'))
+        self.cache = ResponseCache(
+            max_entries=int(os.environ.get('WEATHER_CACHE_MAX_ENTRIES', '2000')),
+            max_bytes=int(os.environ.get('WEATHER_CACHE_MAX_BYTES', str(64 * 1024 * 1024))),
+        )
+        # Forecast-superset mode: fetch the max horizon once per location and slice locally
+        self.forecast_superset = os.environ.get('WEATHER_FORECAST_SUPERSET', 'true').lower() in ('1', 'true', 'yes')
+        self.max_forecast_days = 10  # API supports max 10 days
+        # Keep cached forecasts as typed hourly arrays instead of HourWeather objects
+        self.columnar_cache = os.environ.get('WEATHER_CACHE_COLUMNAR', 'false').lower() in ('1', 'true', 'yes')
+
+        # Client-side budget for upstream calls, sized to the WeatherAPI plan
+        self.upstream_budget = QuotaBudget(
+            per_minute=int(os.environ.get('WEATHER_API_RATE_PER_MINUTE', '1000')),
+            monthly_quota=int(os.environ.get('WEATHER_API_MONTHLY_QUOTA', '1000000')),
+            monthly_reserve=float(os.environ.get('WEATHER_API_QUOTA_RESERVE', '0.05')),
+        )
+        self.budget_fallbacks = 0
+        self.quota_block_seconds = float(os.environ.get('WEATHER_API_QUOTA_BLOCK', '60'))
+
+        # Per-endpoint timeouts so a degraded upstream fails fast instead of holding worker slots
+        self.upstream_timeouts = {
+            endpoint: aiohttp.ClientTimeout(total=float(os.environ.get(f'WEATHER_API_TIMEOUT_{endpoint.upper()}', default)))
+            for endpoint, default in (('current', '5'), ('forecast', '8'), ('search', '3'))
+        }
+        self.breaker = CircuitBreaker(
+            failure_threshold=int(os.environ.get('WEATHER_BREAKER_FAILURES', '5')),
+            reset_timeout=float(os.environ.get('WEATHER_BREAKER_RESET', '30')),
+        )
+        # Send a second copy of a slow request after this many seconds (0 disables hedging)
+        self.hedge_delay = float(os.environ.get('WEATHER_API_HEDGE_DELAY', '0'))
+        self.hedges_sent = 0
+        self.hedges_won = 0
+        # Last time upstream answered at all, so health probes can piggyback on real traffic
+        self.last_upstream_ok: Optional[float] = None
+
+        # Coordinate lookups are snapped to a grid (degrees, 0 keeps exact coordinates)
+        self.geo_grid = GeoGrid(float(os.environ.get('WEATHER_COORD_GRID', '0.05')))
+
+        # Upper bound on concurrent lookups per batch request
+        self.batch_concurrency = int(os.environ.get('WEATHER_BATCH_CONCURRENCY', '10'))
+
+        # Local autocomplete index; upstream search is only used when it has too few matches
+        self.city_index_enabled = os.environ.get('CITY_INDEX_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+        self.city_index_min_results = int(os.environ.get('CITY_INDEX_MIN_RESULTS', '5'))
+        self.city_search_limit = 10
+        self.city_index = CityIndex()
+        if self.city_index_enabled:
+            self.city_index.load_gazetteer(os.environ.get('CITY_GAZETTEER_PATH'))
+        self.city_search_local = 0
+        self.city_search_upstream = 0
+        self.search_cache = SearchPrefixCache(
+            ttl=float(os.environ.get('CITY_SEARCH_CACHE_TTL', '86400')),
+            max_entries=int(os.environ.get('CITY_SEARCH_CACHE_MAX_ENTRIES', '5000')),
+            upstream_limit=int(os.environ.get('CITY_SEARCH_UPSTREAM_LIMIT', '10')),
+        )
+
+        # Optional second tier shared with other workers/hosts, configured by the app
+        self.shared_cache: Optional[SharedCacheChain] = None
+
+        # Hot entries saved to disk periodically and on shutdown, read back lazily after a restart
+        snapshot_path = os.environ.get('WEATHER_CACHE_SNAPSHOT', str(DEFAULT_SNAPSHOT_PATH))
+        self.snapshot = CacheSnapshot(snapshot_path) if snapshot_path.lower() not in ('', 'off', 'false') else None
+        self.snapshot_interval = float(os.environ.get('WEATHER_CACHE_SNAPSHOT_INTERVAL', '300'))
+        self.snapshot_max_entries = int(os.environ.get('WEATHER_CACHE_SNAPSHOT_MAX_ENTRIES', '1000'))
+
+        self._refreshing = set()
+        self._background_tasks = set()
+        self.single_flight = SingleFlight()
+
+    async def start(self):
+        """Open the shared keep-alive session (called from the app startup hook)"""
+        if self._session is None or self._session.closed:
+            self._connector = aiohttp.TCPConnector(
+                limit=self.pool_size,
+                limit_per_host=self.pool_size,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=self.dns_cache_ttl,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=self._connector,
+                trace_configs=[self.pool_stats.trace_config()],
+            )
+
+    async def close(self):
+        """Save the cache snapshot, then close the shared session and its connection pool"""
+        for task in list(self._background_tasks):
+            task.cancel()
+        await self.save_snapshot()
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._connector = None
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        # Lazily open the session if the service is used outside the app lifecycle
+        if self._session is None or self._session.closed:
+            await self.start()
+        return self._session
+
+    def render_json(self, weather: WeatherResponse) -> bytes:
+        """Serialized JSON for a response, memoized on the cache entry it came from"""
+        return self.cache.derive(weather, "json", lambda: self._serialize(weather), len)
+
+    @staticmethod
+    def _serialize(weather: WeatherResponse) -> bytes:
+        with stage("serialize"):
+            return weather.__pydantic_serializer__.to_json(weather)
+
+    def get_pool_stats(self) -> dict:
+        """Connection pool metrics for the shared upstream session"""
+        stats = self.pool_stats.snapshot(self._connector)
+        stats["pool_size"] = self.pool_size
+        return stats
+
+    def get_cache_stats(self) -> dict:
+        """Hit/miss/eviction counters for the response cache"""
+        stats = self.cache.stats()
+        stats["refreshing"] = len(self._refreshing)
+        return stats
+
+    def get_city_search_stats(self) -> dict:
+        """Local index vs upstream split for city autocomplete"""
+        stats = self.city_index.stats()
+        stats["local_answers"] = self.city_search_local
+        stats["upstream_fallbacks"] = self.city_search_upstream
+        stats["prefix_cache"] = self.search_cache.stats()
+        return stats
+
+    def get_budget_stats(self) -> dict:
+        """Remaining upstream budget and how often load was shed onto cached data"""
+        stats = self.upstream_budget.stats()
+        stats["served_from_cache"] = self.budget_fallbacks
+        return stats
+
+    def get_breaker_stats(self) -> dict:
+        """Circuit breaker state, recent transitions and hedging counters"""
+        stats = self.breaker.stats()
+        stats["timeouts_s"] = {endpoint: timeout.total for endpoint, timeout in self.upstream_timeouts.items()}
+        stats["hedge_delay_s"] = self.hedge_delay
+        stats["hedges_sent"] = self.hedges_sent
+        stats["hedges_won"] = self.hedges_won
+        return stats
+
+    def get_shared_cache_stats(self) -> Optional[dict]:
+        """Per-tier counters for the shared second-tier cache, None when it is disabled"""
+        return self.shared_cache.stats() if self.shared_cache is not None else None
+
+    def get_snapshot_stats(self) -> Optional[dict]:
+        """Cache snapshot load and save counters, None when snapshots are disabled"""
+        return self.snapshot.stats() if self.snapshot is not None else None
+
+    def get_geo_grid_stats(self) -> dict:
+        """How coordinate lookups were mapped onto shared cache keys"""
+        return self.geo_grid.stats()
+
+    def get_coalescing_stats(self) -> dict:
+        """How many callers were served by an already in-flight upstream fetch"""
+        return self.single_flight.stats()
+
+    async def _cached(self, key: str, ttl: float, fetch: Callable[[], Awaitable[Tuple[Any, int]]]) -> Any:
+        """Serve from cache, refreshing stale entries in the background"""
+        value, fresh = self.cache.get(key)
+        if value is not None:
+            if not fresh:
+                self._schedule_refresh(key, ttl, fetch)
+            return value
+
+        try:
+            # On a miss a stale shared copy is fine; it is served while we refresh it
+            value = await self.single_flight.do(key, lambda: self._fetch_and_store(key, ttl, fetch, float("-inf")))
+            expires_in = self.cache.expires_in(key)
+            if expires_in is not None and expires_in <= 0:
+                self._schedule_refresh(key, ttl, fetch)
+            return value
+        except (UpstreamBudgetExceeded, CircuitOpenError) as e:
+            # Out of budget or upstream is down: an expired copy beats an error
+            fallback = self.cache.last_known(key)
+            if fallback is None:
+                raise
+            if isinstance(e, CircuitOpenError):
+                self.breaker.fallbacks += 1
+            else:
+                self.budget_fallbacks += 1
+            return fallback
+
+    async def _fetch_and_store(self, key: str, ttl: float, fetch: Callable[[], Awaitable[Tuple[Any, int]]],
+                               min_fresh: float = 0) -> Any:
+        """Take the value from the snapshot or shared tier if it stays fresh for min_fresh seconds, else fetch upstream"""
+        value = self._load_snapshot(key, min_fresh)
+        if value is None:
+            value = await self._load_shared(key, min_fresh)
+        if value is not None:
+            return value
+
+        value, size = await fetch()
+        self.cache.set(key, value, size, ttl, self.stale_ttl)
+        self._store_shared(key, value, ttl)
+        return value
+
+    async def _load_shared(self, key: str, min_fresh: float) -> Optional[Any]:
+        if self.shared_cache is None:
+            return None
+        with stage("shared_cache"):
+            entry = await self.shared_cache.get(key, min_fresh)
+        if entry is None:
+            return None
+        return self._restore(key, entry)
+
+    def _load_snapshot(self, key: str, min_fresh: float) -> Optional[Any]:
+        if self.snapshot is None:
+            return None
+        entry = self.snapshot.take(key)
+        if entry is None or entry.expires_at - time.time() < min_fresh:
+            return None
+        return self._restore(key, entry)
+
+    def _restore(self, key: str, entry: SharedEntry) -> Any:
+        now = time.time()
+        value, size = self._decode_shared(entry.payload)
+        # Keep the remaining lifetime the filling worker gave it
+        self.cache.set(key, value, size, entry.expires_at - now, entry.stale_until - entry.expires_at)
+        return value
+
+    async def start_snapshots(self):
+        """Load the last cache snapshot and start saving new ones (called from the app startup hook)"""
+        if self.snapshot is None:
+            return
+        try:
+            loaded = await asyncio.to_thread(self.snapshot.open)
+        except OSError as e:
+            logger.warning(f"Failed to open cache snapshot {self.snapshot.path}: {e}")
+            loaded = 0
+        # Search results are small and answer prefixes of other queries, so restore them all now
+        for key in self.snapshot.keys("search:"):
+            entry = self.snapshot.take(key)
+            if entry is not None:
+                results = [CitySearchResult(**city) for city in json.loads(entry.payload)]
+                self.search_cache.set(key[len("search:"):], results, entry.expires_at - time.time())
+        logger.info(f"Loaded {loaded} entries from cache snapshot {self.snapshot.path}")
+        if self.snapshot_interval > 0:
+            self._spawn(self._save_snapshots())
+
+    async def _save_snapshots(self):
+        while True:
+            await asyncio.sleep(self.snapshot_interval)
+            await self.save_snapshot()
+
+    def snapshot_items(self) -> List[Tuple[str, Any, float, float]]:
+        """The most recently used weather entries and all city searches, with wall-clock expiry, still unencoded"""
+        now = time.time()
+        items = [(key, value, now + expires_in, now + stale_in)
+                 for key, value, expires_in, stale_in in self.cache.items(self.snapshot_max_entries)]
+        items.extend((f"search:{key}", results, now + expires_in, now + expires_in)
+                     for key, expires_in, results in self.search_cache.items())
+        return items
+
+    @classmethod
+    def encode_snapshot(cls, items: List[Tuple[str, Any, float, float]]) -> List[Tuple[str, SharedEntry]]:
+        """Serialize snapshot items without touching cache state, so it can run off the event loop"""
+        entries = []
+        for key, value, expires_at, stale_until in items:
+            if key.startswith("search:"):
+                payload = json.dumps([city.model_dump() for city in value]).encode()
+            else:
+                payload = cls._encode_payload(value)
+            entries.append((key, SharedEntry(payload, expires_at, stale_until)))
+        return entries
+
+    async def save_snapshot(self) -> int:
+        """Write the current hot entries to the snapshot file; returns how many were saved"""
+        if self.snapshot is None:
+            return 0
+        try:
+            # Only collecting references happens on the loop; encoding ~1ms per forecast does not
+            items = self.snapshot_items()
+            # Entries not yet read back from the previous snapshot are still worth keeping
+            pending = self.snapshot.pending()
+            return await asyncio.to_thread(self._write_snapshot, items, pending)
+        except Exception as e:
+            logger.error(f"Failed to save cache snapshot {self.snapshot.path}: {e}")
+            return 0
+
+    def _write_snapshot(self, items: List[Tuple[str, Any, float, float]],
+                        pending: List[Tuple[str, SharedEntry]]) -> int:
+        entries = self.encode_snapshot(items)
+        saved = {key for key, _ in entries}
+        entries.extend((key, entry) for key, entry in pending if key not in saved)
+        return self.snapshot.write(entries)
+
+    def _store_shared(self, key: str, value: Any, ttl: float):
+        if self.shared_cache is None:
+            return
+        now = time.time()
+        entry = SharedEntry(self._encode_shared(value), now + ttl, now + ttl + self.stale_ttl)
+        # Other workers can wait a moment; the caller should not
+        self._spawn(self.shared_cache.set(key, entry))
+
+    def _encode_shared(self, value: Union[WeatherResponse, CompactForecast]) -> bytes:
+        if isinstance(value, CompactForecast):
+            return self._encode_payload(value)
+        # The JSON memoized for serving this response is the payload
+        return b"W" + self.render_json(value)
+
+    @staticmethod
+    def _encode_payload(value: Union[WeatherResponse, CompactForecast]) -> bytes:
+        # One-byte tag so readers rebuild the same representation
+        if isinstance(value, CompactForecast):
+            return b"C" + value.to_response(len(value.days)).model_dump_json().encode()
+        return b"W" + value.__pydantic_serializer__.to_json(value)
+
+    @staticmethod
+    def _decode_shared(payload: bytes) -> Tuple[Union[WeatherResponse, CompactForecast], int]:
+        with stage("validate"):
+            weather = WeatherResponse.model_validate_json(payload[1:])
+        if payload[:1] == b"C":
+            with stage("columnar"):
+                compact = CompactForecast.from_response(weather)
+            return compact, compact.nbytes
+        return weather, parsed_size(payload[1:])
+
+    def _spawn(self, coro: Awaitable[Any]):
+        task = asyncio.create_task(coro)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+    def _schedule_refresh(self, key: str, ttl: float, fetch: Callable[[], Awaitable[Tuple[Any, int]]]):
+        # Only one background refresh per key at a time
+        if key in self._refreshing:
+            return
+        self._refreshing.add(key)
+        self._spawn(self._refresh(key, ttl, fetch))
+
+    async def _refresh(self, key: str, ttl: float, fetch: Callable[[], Awaitable[Tuple[Any, int]]]):
+        try:
+            with priority_scope(Priority.BACKGROUND):
+                await self.single_flight.do(key, lambda: self._fetch_and_store(key, ttl, fetch))
+        except UpstreamBudgetExceeded:
+            logger.info(f"Skipped background refresh for {key}: upstream budget low")
+        except CircuitOpenError:
+            logger.info(f"Skipped background refresh for {key}: circuit open")
+        except Exception as e:
+            logger.warning(f"Background refresh failed for {key}: {e}")
+        finally:
+            self._refreshing.discard(key)
+
+    def _forecast_entry(self, location: str, days: Optional[int] = None) -> Tuple[str, float, Callable[[], Awaitable[Tuple[Any, int]]]]:
+        """Cache key, TTL and fetch for a location's forecast (days is ignored in superset mode)"""
+        if self.forecast_superset:
+            days = self.max_forecast_days
+        key = f"forecast:{normalize_location(location)}:{days}"
+        if self.forecast_superset and self.columnar_cache:
+            return key, self.forecast_ttl, lambda: self._fetch_compact_forecast(location, days)
+        return key, self.forecast_ttl, lambda: self._fetch_weather_forecast(location, days)
+
+    def http_max_age(self, location: str, days: Optional[int] = None) -> int:
+        """Seconds clients may reuse a response for a location: what is left of the cache entry behind it"""
+        if days is None and not self.forecast_superset:
+            key, ttl = f"current:{normalize_location(location)}", self.current_ttl
+        else:
+            key, ttl, _ = self._forecast_entry(location, min(days or 1, self.max_forecast_days))
+        expires_in = self.cache.expires_in(key)
+        return int(min(max(expires_in if expires_in is not None else ttl, 0), ttl))
+
+    async def _get_forecast_superset(self, location: str) -> Union[WeatherResponse, CompactForecast]:
+        """Max-horizon forecast for a location, shared by every days value and current-only lookups"""
+        return await self._cached(*self._forecast_entry(location))
+
+    async def refresh_ahead(self, location: str, lead: float, days: int = 3) -> Tuple[bool, float]:
+        """Refetch a location's forecast if it goes stale within `lead` seconds
+
+        Returns (refreshed, seconds until the next refresh is due). Runs at
+        background priority, so a low budget raises UpstreamBudgetExceeded.
+        """
+        key, ttl, fetch = self._forecast_entry(location, min(days, self.max_forecast_days))
+        expires_in = self.cache.expires_in(key)
+        if expires_in is not None and expires_in > lead:
+            return False, expires_in - lead
+
+        with priority_scope(Priority.BACKGROUND):
+            # Another worker may already have refreshed it in the shared tier
+            await self.single_flight.do(key, lambda: self._fetch_and_store(key, ttl, fetch, lead))
+        return True, (self.cache.expires_in(key) or ttl) - lead
+
+    async def _fetch_compact_forecast(self, location: str, days: int) -> Tuple[CompactForecast, int]:
+        weather, _ = await self._fetch_weather_forecast(location, days)
+        with stage("columnar"):
+            compact = CompactForecast.from_response(weather)
+        return compact, compact.nbytes
+
+    def _slice_forecast(self, weather: Union[WeatherResponse, CompactForecast], days: Optional[int]) -> WeatherResponse:
+        """Trim a superset response to the requested horizon (None drops the forecast entirely)"""
+        if isinstance(weather, CompactForecast) and days is not None:
+            # Keeping materialized hours around would undo what columnar storage saves, so rebuild per request
+            return self._timed_slice(weather, days)
+        # Plain slices share their models with the cached response, so memoizing them is free
+        return self.cache.derive(weather, days, lambda: self._timed_slice(weather, days))
+
+    def _timed_slice(self, weather: Union[WeatherResponse, CompactForecast], days: Optional[int]) -> WeatherResponse:
+        with stage("slice"):
+            return self._build_slice(weather, days)
+
+    @staticmethod
+    def _build_slice(weather: Union[WeatherResponse, CompactForecast], days: Optional[int]) -> WeatherResponse:
+        if isinstance(weather, CompactForecast):
+            return weather.to_response(days)
+        if days is None or weather.forecast is None:
+            return weather.model_copy(update={"forecast": None})
+        forecastday = weather.forecast.forecastday
+        if len(forecastday) <= days:
+            return weather
+        return weather.model_copy(update={"forecast": Forecast(forecastday=forecastday[:days])})
+
+    async def _upstream_get(self, endpoint: str, params: dict) -> Tuple[int, bytes]:
+        """GET an upstream endpoint through the circuit breaker, budget, timeout and optional hedge"""
+        self.breaker.before_call()
+        UPSTREAM_IN_FLIGHT.inc(endpoint=endpoint)
+        try:
+            with stage("budget"):
+                await self.upstream_budget.acquire()
+            with stage("upstream"):
+                status, body = await self._hedged_get(endpoint, params)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            self.breaker.record_failure(type(e).__name__)
+            UPSTREAM_RESPONSES.inc(endpoint=endpoint, status="timeout" if isinstance(e, asyncio.TimeoutError) else "error")
+            raise
+        except BaseException:
+            self.breaker.release()
+            raise
+        finally:
+            UPSTREAM_IN_FLIGHT.dec(endpoint=endpoint)
+
+        UPSTREAM_RESPONSES.inc(endpoint=endpoint, status=status)
+        if status >= 500:
+            self.breaker.record_failure(f"HTTP {status}")
+        else:
+            self.breaker.record_success()
+            self.last_upstream_ok = time.monotonic()
+        return status, body
+
+    async def probe_upstream(self, max_age: float = 0) -> dict:
+        """Check upstream reachability without spending quota
+
+        An upstream answer seen within max_age seconds counts as proof; otherwise a
+        keyless request is sent, which WeatherAPI rejects without charging the plan.
+        """
+        if self.last_upstream_ok is not None and time.monotonic() - self.last_upstream_ok <= max_age:
+            return {"source": "traffic", "circuit": self.breaker.state}
+
+        session = await self._get_session()
+        async with session.get(f"{self.base_url}/current.json", timeout=self.upstream_timeouts["search"]) as response:
+            if response.status >= 500:
+                raise ValueError(f"Weather service error: {response.status}")
+        self.last_upstream_ok = time.monotonic()
+        return {"source": "probe", "circuit": self.breaker.state}
+
+    async def _send(self, endpoint: str, params: dict) -> Tuple[int, bytes]:
+        session = await self._get_session()
+        async with session.get(f"{self.base_url}/{endpoint}.json", params=params,
+                               timeout=self.upstream_timeouts[endpoint]) as response:
+            return response.status, await response.read()
+
+    async def _hedged_get(self, endpoint: str, params: dict) -> Tuple[int, bytes]:
+        """First successful answer of the request and, if it is slow, one hedged copy"""
+        if self.hedge_delay <= 0:
+            return await self._send(endpoint, params)
+
+        primary = asyncio.ensure_future(self._send(endpoint, params))
+        tasks = [primary]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.hedge_delay)
+            # Hedges are extra upstream calls, so they only go out while the budget has slack
+            if done or not self.upstream_budget.would_allow(Priority.BACKGROUND):
+                return await primary
+            await self.upstream_budget.acquire(Priority.BACKGROUND)
+            self.hedges_sent += 1
+            hedge = asyncio.ensure_future(self._send(endpoint, params))
+            tasks.append(hedge)
+
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self.hedges_won += 1
+                        return task.result()
+            return primary.result()
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+                elif not task.cancelled():
+                    task.exception()  # mark as retrieved
+
     async def get_current_weather(self, city: str) -> WeatherResponse:
         """Get current weather for a city"""
-        url = f"{self.base_url}/current.json"
+        if self.forecast_superset:
+            return self._slice_forecast(await self._get_forecast_superset(city), None)
+        key = f"current:{normalize_location(city)}"
+        return await self._cached(key, self.current_ttl, lambda: self._fetch_current_weather(city))
+
+    async def _fetch_current_weather(self, city: str) -> Tuple[WeatherResponse, int]:
         params = {
             'key': self.api_key,
             'q': city,
@@ -24,25 +873,28 @@ class WeatherService:
         }
         
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, params=params) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        return WeatherResponse(**data)
-                    elif response.status == 400:
-                        error_data = await response.json()
-                        error_msg = error_data.get('error', {}).get('message', 'Invalid request')
-                        if 'No matching location found' in error_msg:
-                            raise ValueError(f"City '{city}' not found")
-                        else:
-                            raise ValueError(error_msg)
-                    elif response.status == 401:
-                        raise ValueError("Invalid API key")
-                    elif response.status == 403:
-                        raise ValueError("API key exceeded quota")
-                    else:
-                        raise ValueError(f"Weather service error: {response.status}")
-        except aiohttp.ClientError as e:
+            status, body = await self._upstream_get("current", params)
+            if status == 200:
+                # Validate straight from the raw bytes in one pass
+                with stage("validate"):
+                    return WeatherResponse.model_validate_json(body), parsed_size(body)
+            elif status == 400:
+                error_data = json.loads(body)
+                error_msg = error_data.get('error', {}).get('message', 'Invalid request')
+                if 'No matching location found' in error_msg:
+                    raise ValueError(f"City '{city}' not found")
+                else:
+                    raise ValueError(error_msg)
+            elif status == 401:
+                raise ValueError("Invalid API key")
+            elif status == 403:
+                self.upstream_budget.block_for(self.quota_block_seconds)
+                raise ValueError("API key exceeded quota")
+            else:
+                raise ValueError(f"Weather service error: {status}")
+        except (UpstreamBudgetExceeded, CircuitOpenError):
+            raise
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
             logger.error(f"Network error fetching weather for {city}: {e}")
             raise ValueError("Network connection failed")
         except Exception as e:
@@ -51,35 +903,45 @@ class WeatherService:
 
     async def get_weather_forecast(self, city: str, days: int = 3) -> WeatherResponse:
         """Get weather forecast for a city"""
-        url = f"{self.base_url}/forecast.json"
+        days = min(days, self.max_forecast_days)
+        if self.forecast_superset:
+            return self._slice_forecast(await self._get_forecast_superset(city), days)
+        return await self._cached(*self._forecast_entry(city, days))
+
+    async def _fetch_weather_forecast(self, city: str, days: int) -> Tuple[WeatherResponse, int]:
         params = {
             'key': self.api_key,
             'q': city,
-            'days': min(days, 10),  # API supports max 10 days
+            'days': days,
             'aqi': 'no',
             'alerts': 'no'
         }
         
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, params=params) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        return WeatherResponse(**data)
-                    elif response.status == 400:
-                        error_data = await response.json()
-                        error_msg = error_data.get('error', {}).get('message', 'Invalid request')
-                        if 'No matching location found' in error_msg:
-                            raise ValueError(f"City '{city}' not found")
-                        else:
-                            raise ValueError(error_msg)
-                    elif response.status == 401:
-                        raise ValueError("Invalid API key")
-                    elif response.status == 403:
-                        raise ValueError("API key exceeded quota")
-                    else:
-                        raise ValueError(f"Weather service error: {response.status}")
-        except aiohttp.ClientError as e:
+            status, body = await self._upstream_get("forecast", params)
+            if status == 200:
+                # Validate straight from the raw bytes in one pass
+                with stage("validate"):
+                    weather = WeatherResponse.model_validate_json(body)
+                self.geo_grid.record(city, weather.location)
+                return weather, parsed_size(body)
+            elif status == 400:
+                error_data = json.loads(body)
+                error_msg = error_data.get('error', {}).get('message', 'Invalid request')
+                if 'No matching location found' in error_msg:
+                    raise ValueError(f"City '{city}' not found")
+                else:
+                    raise ValueError(error_msg)
+            elif status == 401:
+                raise ValueError("Invalid API key")
+            elif status == 403:
+                self.upstream_budget.block_for(self.quota_block_seconds)
+                raise ValueError("API key exceeded quota")
+            else:
+                raise ValueError(f"Weather service error: {status}")
+        except (UpstreamBudgetExceeded, CircuitOpenError):
+            raise
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
             logger.error(f"Network error fetching forecast for {city}: {e}")
             raise ValueError("Network connection failed")
         except Exception as e:
@@ -90,52 +952,119 @@ class WeatherService:
         """Search for cities by name"""
         if len(query.strip()) < 2:
             return []
-        
-        url = f"{self.base_url}/search.json"
+
+        if not self.city_index_enabled:
+            return await self._search_upstream(query)
+
+        local = self.city_index.search(query, self.city_search_limit)
+        if len(local) >= self.city_index_min_results:
+            self.city_search_local += 1
+            return local
+
+        self.city_search_upstream += 1
+        upstream = await self._search_upstream(query)
+        if upstream:
+            # Upstream can match beyond the name prefix, so keep its results and top up from the index
+            self.city_index.add_many(upstream)
+            return self.city_index.rank(upstream + self.city_index.search(query, self.city_search_limit),
+                                        self.city_search_limit)
+        return local or self.city_index.fuzzy_search(query, self.city_search_limit)
+
+    async def _search_upstream(self, query: str) -> List[CitySearchResult]:
+        """Upstream city search behind the memoized prefix cache"""
+        cached = self.search_cache.get(query)
+        if cached is not None:
+            return cached
+
+        try:
+            results = await self._fetch_city_search(query)
+        except (UpstreamBudgetExceeded, CircuitOpenError):
+            # The local index answers instead
+            return []
+        if results is None:
+            return []
+        self.search_cache.set(query, results)
+        return results
+
+    async def _fetch_city_search(self, query: str) -> Optional[List[CitySearchResult]]:
+        """Raw search.json call; None means the lookup failed and must not be cached"""
         params = {
             'key': self.api_key,
             'q': query
         }
         
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, params=params) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        return [CitySearchResult(**city) for city in data]
-                    elif response.status == 400:
-                        # Search endpoint might return empty array for no results
-                        return []
-                    else:
-                        logger.warning(f"City search failed with status {response.status}")
-                        return []
+            status, body = await self._upstream_get("search", params)
+            if status == 200:
+                return [CitySearchResult(**city) for city in json.loads(body)]
+            elif status == 400:
+                # Search endpoint might return empty array for no results
+                return []
+            else:
+                logger.warning(f"City search failed with status {status}")
+                return None
+        except (UpstreamBudgetExceeded, CircuitOpenError):
+            raise
         except Exception as e:
             logger.error(f"Error searching cities for query '{query}': {e}")
-            return []
+            return None
 
     async def get_weather_by_coordinates(self, lat: float, lon: float, days: int = 3) -> WeatherResponse:
-        """Get weather forecast by coordinates"""
-        url = f"{self.base_url}/forecast.json"
-        params = {
-            'key': self.api_key,
-            'q': f"{lat},{lon}",
-            'days': min(days, 10),
-            'aqi': 'no',
-            'alerts': 'no'
-        }
-        
+        """Get weather forecast by coordinates, shared by every lookup in the same grid cell"""
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, params=params) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        return WeatherResponse(**data)
-                    else:
-                        raise ValueError(f"Failed to get weather for coordinates: {response.status}")
-        except Exception as e:
+            return await self.get_weather_forecast(self.geo_grid.query_for(lat, lon), days)
+        except (UpstreamBudgetExceeded, CircuitOpenError):
+            raise
+        except ValueError as e:
             logger.error(f"Error fetching weather for coordinates {lat},{lon}: {e}")
             raise ValueError("Failed to get weather data")
 
+    async def get_forecast_columns(self, city: str, days: int = 3) -> CompactForecast:
+        """Forecast with hourly data as NumPy columns, for vectorized analytics"""
+        days = min(days, self.max_forecast_days)
+        if self.forecast_superset and self.columnar_cache:
+            return await self._get_forecast_superset(city)
+        weather = await self.get_weather_forecast(city, days)
+        return self.cache.derive(weather, "columns", lambda: CompactForecast.from_response(weather),
+                                 lambda compact: compact.nbytes)
+
+    async def get_forecast_columns_many(self, cities: List[str], days: int = 3) -> List[Any]:
+        """get_forecast_columns for many cities with bounded concurrency; failures are returned as exceptions"""
+        semaphore = asyncio.Semaphore(self.batch_concurrency)
+
+        async def fetch_one(city: str) -> CompactForecast:
+            async with semaphore:
+                return await self.get_forecast_columns(city, days)
+
+        return await asyncio.gather(*(fetch_one(city) for city in cities), return_exceptions=True)
+
+    async def iter_weather_batch(self, items: List[Union[BatchWeatherItem, dict]],
+                                 days: int = 3) -> AsyncIterator[Tuple[int, Any]]:
+        """Fetch many locations with bounded concurrency, yielding (index, weather or exception) as each completes
+
+        Items that fail BatchWeatherItem validation yield their ValidationError.
+        """
+        semaphore = asyncio.Semaphore(self.batch_concurrency)
+
+        async def fetch_one(index: int, item: Union[BatchWeatherItem, dict]) -> Tuple[int, Any]:
+            try:
+                query = BatchWeatherItem.model_validate(item)
+                async with semaphore:
+                    if query.city:
+                        return index, await self.get_weather_forecast(query.city, days)
+                    return index, await self.get_weather_by_coordinates(query.lat, query.lon, days)
+            except Exception as e:
+                return index, e
+
+        tasks = [asyncio.create_task(fetch_one(index, item)) for index, item in enumerate(items)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # Client went away mid-stream: stop the remaining lookups
+            for task in tasks:
+                task.cancel()
+
 # Singleton instance - initialize only when needed and env vars are loaded
 _weather_service = None
 
@@ -238,21 +238,35 @@ const Dashboard = () => {
     };
   }, [weatherData]);
 
-  // Auto-refresh functionality
+  // Auto-refresh functionality: live updates from the server, polling only if the stream fails
   useEffect(() => {
-    if (autoRefresh && currentCity) {
-      intervalRef.current = setInterval(() => {
-        handleCitySearch(currentCity);
-      }, refreshInterval);
-    } else {
-      if (intervalRef.current) {
-        clearInterval(intervalRef.current);
-      }
+    if (!autoRefresh || !currentCity) {
+      return undefined;
     }
-    
+
+    const applyCurrent = (current) => {
+      setWeatherData(prev => prev ? { ...prev, current: { ...prev.current, ...current } } : prev);
+      setForecastData(prev => prev ? { ...prev, current: { ...prev.current, ...current } } : prev);
+      setLastUpdated(new Date());
+    };
+
+    const closeLive = weatherAPI.subscribeLive([currentCity], {
+      onSnapshot: (location, weather) => applyCurrent(weather.current),
+      onDelta: (location, current) => applyCurrent(current),
+      onError: (location, message) => console.warn(`Live updates failed for ${location}: ${message}`),
+      onDisconnect: () => {
+        console.warn('Live updates unavailable, falling back to polling');
+        intervalRef.current = setInterval(() => {
+          handleCitySearch(currentCity);
+        }, refreshInterval);
+      },
+    });
+
     return () => {
+      closeLive();
       if (intervalRef.current) {
         clearInterval(intervalRef.current);
+        intervalRef.current = null;
       }
     };
   }, [autoRefresh, refreshInterval, currentCity]);
@@ -394,7 +408,7 @@ const Dashboard = () => {
     setIsLoading(true);
     
     try {
-      const data = await weatherAPI.getWeather(cityName, 7); // Extended forecast
+      const data = await weatherAPI.getWeatherForecast(cityName, 7, 'chart'); // Extended forecast, chart fields only; refreshes revalidate by ETag
       
       setWeatherData({
         location: data.location,
@@ -2,6 +2,7 @@ import axios from 'axios';
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL || 'http://localhost:8000';
 const API = `${BACKEND_URL}/api`;
+const MAX_VALIDATORS = 20;
 
 class WeatherAPI {
   constructor() {
@@ -13,6 +14,9 @@ class WeatherAPI {
       },
     });
 
+    // Last ETag and body per forecast request, so refreshes can be answered with 304
+    this.validators = new Map();
+
     // Request interceptor for logging
     this.client.interceptors.request.use(
       (config) => {
@@ -58,22 +62,40 @@ class WeatherAPI {
     }
   }
 
-  async getWeatherForecast(city, days = 3) {
+  async getWeatherForecast(city, days = 3, view = undefined) {
     try {
-      const response = await this.client.get(`/weather/forecast/${encodeURIComponent(city)}`, {
-        params: { days }
+      const url = `/weather/forecast/${encodeURIComponent(city)}`;
+      const key = `${url}?days=${days}&view=${view || ''}`;
+      const cached = this.validators.get(key);
+      const response = await this.client.get(url, {
+        params: { days, view },
+        headers: cached ? { 'If-None-Match': cached.etag } : {},
+        validateStatus: (status) => (status >= 200 && status < 300) || status === 304,
       });
+      if (response.status === 304 && cached) {
+        return cached.data;
+      }
+
+      const etag = response.headers.etag;
+      if (etag) {
+        this.validators.delete(key);
+        this.validators.set(key, { etag, data: response.data });
+        if (this.validators.size > MAX_VALIDATORS) {
+          this.validators.delete(this.validators.keys().next().value);
+        }
+      }
       return response.data;
     } catch (error) {
       this.handleError(error, city);
     }
   }
 
-  async getWeather(city, days = 3) {
+  async getWeather(city, days = 3, view = undefined) {
     try {
       const response = await this.client.post('/weather', {
         city,
-        days
+        days,
+        view
       });
       return response.data;
     } catch (error) {
@@ -108,6 +130,34 @@ class WeatherAPI {
     }
   }
 
+  subscribeLive(locations, { onSnapshot, onDelta, onError, onDisconnect } = {}) {
+    // One stream for all locations; returns a function that closes it.
+    // onDisconnect fires once if the stream itself fails, so callers can fall back to polling.
+    const params = new URLSearchParams({ locations: locations.join(',') });
+    const source = new EventSource(`${API}/weather/live?${params}`);
+
+    source.addEventListener('snapshot', (event) => {
+      const { location, weather } = JSON.parse(event.data);
+      onSnapshot?.(location, weather);
+    });
+    source.addEventListener('delta', (event) => {
+      const { location, current } = JSON.parse(event.data);
+      onDelta?.(location, current);
+    });
+    source.addEventListener('error', (event) => {
+      // Server-sent error events carry data; anything else is the connection failing
+      if (event.data) {
+        const { location, message } = JSON.parse(event.data);
+        onError?.(location, message);
+        return;
+      }
+      source.close();
+      onDisconnect?.();
+    });
+
+    return () => source.close();
+  }
+
   async getSearchHistory(limit = 50) {
     try {
       const response = await this.client.get('/history/searches', {
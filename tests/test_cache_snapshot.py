@@ -0,0 +1,35 @@
+import time
+
+from cache_snapshot import CacheSnapshot
+from shared_cache import SharedEntry
+
+
+def entry(payload, expires_in, stale_in=None):
+    now = time.time()
+    return SharedEntry(payload, now + expires_in, now + (stale_in if stale_in is not None else expires_in))
+
+
+def test_workers_merge_into_one_snapshot(tmp_path):
+    path = str(tmp_path / "cache.snapshot")
+    first, second = CacheSnapshot(path), CacheSnapshot(path)
+    first.write([("forecast:oslo:10", entry(b"oslo", 60)), ("current:rome", entry(b"old rome", 30))])
+    second.write([("forecast:lima:10", entry(b"lima", 60)), ("current:rome", entry(b"new rome", 90))])
+    # An older copy written later does not replace the fresher one
+    first.write([("current:rome", entry(b"old rome", 30)), ("gone", entry(b"x", -20, -10))])
+
+    restarted = CacheSnapshot(path)
+    assert restarted.open() == 3
+    assert restarted.take("forecast:oslo:10").payload == b"oslo"
+    assert restarted.take("forecast:lima:10").payload == b"lima"
+    assert restarted.take("current:rome").payload == b"new rome"
+    assert first.merged == 2
+
+
+def test_truncated_snapshot_keeps_complete_records(tmp_path):
+    path = tmp_path / "cache.snapshot"
+    CacheSnapshot(str(path)).write([("a", entry(b"aaaa", 60)), ("b", entry(b"bbbb", 60))])
+    path.write_bytes(path.read_bytes()[:-2])
+
+    snapshot = CacheSnapshot(str(path))
+    assert snapshot.open() == 1
+    assert snapshot.take("a").payload == b"aaaa"
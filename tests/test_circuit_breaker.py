@@ -0,0 +1,155 @@
+import asyncio
+
+import pytest
+
+import circuit_breaker
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from rate_limiter import UpstreamBudgetExceeded
+from weather_service import WeatherService
+
+
+class Clock:
+    """Stands in for the time module inside circuit_breaker only"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(circuit_breaker, "time", clock)
+    return clock
+
+
+def open_breaker(breaker):
+    for _ in range(breaker.failure_threshold):
+        breaker.before_call()
+        breaker.record_failure("HTTP 500")
+
+
+def test_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+    breaker.before_call()
+    breaker.record_failure("HTTP 500")
+    breaker.before_call()
+    breaker.record_success()
+    assert breaker.consecutive_failures == 0
+
+    open_breaker(breaker)
+    assert breaker.state == "open"
+    clock.now += 10
+    with pytest.raises(CircuitOpenError) as error:
+        breaker.before_call()
+    assert error.value.retry_in == pytest.approx(20)
+    assert breaker.rejected == 1
+
+
+def test_half_open_admits_limited_trial_calls(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30, half_open_max_calls=1)
+    open_breaker(breaker)
+    clock.now += 30
+    breaker.before_call()
+    assert breaker.state == "half_open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_trial_success_closes_and_failure_reopens(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    open_breaker(breaker)
+    clock.now += 30
+    breaker.before_call()
+    breaker.record_failure("timeout")
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    clock.now += 30
+    breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert [t["to"] for t in breaker.transitions] == ["open", "half_open", "open", "half_open", "closed"]
+
+
+def test_release_frees_the_trial_slot(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    open_breaker(breaker)
+    clock.now += 30
+    breaker.before_call()
+    breaker.release()
+    assert breaker.state == "half_open"
+    breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setenv("WEATHER_API_KEY", "test")
+    monkeypatch.setenv("WEATHER_CACHE_SNAPSHOT", "off")
+    service = WeatherService()
+    service.breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    return service
+
+
+def half_open(service, clock):
+    open_breaker(service.breaker)
+    clock.now += 30
+
+
+def test_cancelled_trial_call_is_released(service, clock, monkeypatch):
+    half_open(service, clock)
+
+    async def hang(endpoint, params):
+        await asyncio.sleep(10)
+
+    monkeypatch.setattr(service, "_hedged_get", hang)
+
+    async def cancel_trial():
+        task = asyncio.create_task(service._upstream_get("current", {}))
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_trial())
+    assert service.breaker.state == "half_open"
+    # The slot is free again, so the next caller gets the trial call
+    service.breaker.before_call()
+
+
+def test_budget_refusal_is_released(service, clock, monkeypatch):
+    half_open(service, clock)
+
+    async def refuse(priority=None):
+        raise UpstreamBudgetExceeded()
+
+    monkeypatch.setattr(service.upstream_budget, "acquire", refuse)
+    with pytest.raises(UpstreamBudgetExceeded):
+        asyncio.run(service._upstream_get("current", {}))
+    assert service.breaker.state == "half_open"
+    service.breaker.before_call()
+
+
+def test_upstream_errors_and_timeouts_count_as_failures(service, clock, monkeypatch):
+    async def server_error(endpoint, params):
+        return 500, b"{}"
+
+    monkeypatch.setattr(service, "_hedged_get", server_error)
+    assert asyncio.run(service._upstream_get("current", {}))[0] == 500
+    assert service.breaker.state == "open"
+
+    clock.now += 30
+
+    async def timeout(endpoint, params):
+        raise asyncio.TimeoutError()
+
+    monkeypatch.setattr(service, "_hedged_get", timeout)
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(service._upstream_get("current", {}))
+    assert service.breaker.state == "open"
+    assert service.breaker.transitions[-1]["reason"] == "trial call failed: TimeoutError"
@@ -0,0 +1,40 @@
+import time
+
+from shared_cache import FileCache, SharedEntry
+
+
+def entry(size, expires_in, stale_in=None):
+    now = time.time()
+    return SharedEntry(b"x" * size, now + expires_in, now + (stale_in if stale_in is not None else expires_in))
+
+
+def test_round_trip(tmp_path):
+    cache = FileCache(str(tmp_path))
+    cache._prune()
+    cache._write("forecast:oslo:10", entry(100, 60))
+    assert cache._read("forecast:oslo:10").payload == b"x" * 100
+    assert cache._read("forecast:bergen:10") is None
+
+
+def test_sweep_removes_stale_entries_and_evicts_to_max_bytes(tmp_path):
+    cache = FileCache(str(tmp_path), max_bytes=2500)
+    cache._prune()
+    cache._write("gone", entry(1000, -20, -10))
+    cache._write("soonest", entry(1000, 30))
+    cache._write("later", entry(1000, 60))
+    cache._write("latest", entry(1000, 90))
+    cache._prune()
+
+    assert cache._read("gone") is None
+    assert cache._read("soonest") is None
+    assert cache._read("later") is not None and cache._read("latest") is not None
+    assert cache.swept == 1 and cache.evicted == 1
+
+
+def test_writes_sweep_after_the_interval(tmp_path):
+    cache = FileCache(str(tmp_path), max_bytes=1500, sweep_interval=0)
+    cache._prune()
+    cache._write("first", entry(1000, 30))
+    cache._write("second", entry(1000, 60))
+    assert cache._read("first") is None
+    assert len(list(tmp_path.iterdir())) == 1
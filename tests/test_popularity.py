@@ -0,0 +1,49 @@
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
+
+from popularity import PopularityTracker
+
+
+class Collection:
+    def __init__(self):
+        self.failures = 0
+        self.writes = []
+
+    async def bulk_write(self, ops, ordered=True):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("write failed")
+        self.writes.append(len(ops))
+
+
+def tracker():
+    db = SimpleNamespace(city_popularity=Collection(), city_popularity_hourly=Collection(), search_history=None)
+    tracker = PopularityTracker(db)
+    tracker.record("Oslo", "Norway", "Oslo", datetime(2026, 1, 1, 10, 5))
+    tracker.record("Lima", "Peru", "Lima", datetime(2026, 1, 1, 11, 5))
+    return tracker
+
+
+def test_bucket_failure_retries_only_buckets():
+    popularity = tracker()
+    popularity.buckets.failures = 1
+    asyncio.run(popularity.flush())
+    asyncio.run(popularity.flush())
+
+    assert popularity.totals.writes == [2]
+    assert popularity.buckets.writes == [2]
+    assert not popularity._pending and not popularity._retry_buckets
+
+
+def test_totals_failure_retries_everything():
+    popularity = tracker()
+    popularity.totals.failures = 1
+    asyncio.run(popularity.flush())
+
+    assert popularity.buckets.writes == []
+    assert sum(popularity._pending.values()) == 2
+
+    asyncio.run(popularity.flush())
+    assert popularity.totals.writes == [2]
+    assert popularity.buckets.writes == [2]
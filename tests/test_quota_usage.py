@@ -0,0 +1,49 @@
+import asyncio
+
+from mongomock_motor import AsyncMongoMockClient
+
+from quota_usage import QuotaUsageSync
+from rate_limiter import QuotaBudget
+
+
+async def spend(budget, calls):
+    for _ in range(calls):
+        await budget.acquire()
+
+
+def test_workers_share_and_restarts_keep_the_monthly_count():
+    async def run():
+        collection = AsyncMongoMockClient()["weather"]["upstream_quota_usage"]
+        first, second = QuotaBudget(), QuotaBudget()
+        first_sync, second_sync = QuotaUsageSync(first, collection), QuotaUsageSync(second, collection)
+
+        await spend(first, 3)
+        await first_sync.sync()
+        await spend(second, 2)
+        await second_sync.sync()
+        await first_sync.sync()
+        assert first.monthly_used == second.monthly_used == 5
+
+        await spend(second, 1)
+        await second_sync.stop()
+        restarted = QuotaBudget()
+        await QuotaUsageSync(restarted, collection).sync()
+        assert restarted.monthly_used == 6
+
+    asyncio.run(run())
+
+
+def test_failed_sync_keeps_calls_for_the_next_one():
+    class Failing:
+        async def find_one_and_update(self, *args, **kwargs):
+            raise RuntimeError("mongo down")
+
+    budget = QuotaBudget()
+    sync = QuotaUsageSync(budget, Failing())
+
+    async def run():
+        await spend(budget, 4)
+        assert not await sync.sync()
+
+    asyncio.run(run())
+    assert budget.take_unsynced()[1] == 4
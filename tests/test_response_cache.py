@@ -0,0 +1,48 @@
+from weather_service import ResponseCache
+
+
+class Value:
+    pass
+
+
+def test_derived_values_are_memoized_and_charged():
+    cache = ResponseCache()
+    value = Value()
+    cache.set("a", value, 100, ttl=60)
+    body = cache.derive(value, "json", lambda: b"x" * 50, len)
+    assert cache.derive(value, "json", lambda: b"other", len) is body
+    assert cache.stats()["bytes"] == 150
+
+
+def test_values_derived_from_derived_values_share_the_entry():
+    cache = ResponseCache()
+    value = Value()
+    cache.set("a", value, 100, ttl=60)
+    sliced = cache.derive(value, 3, Value)
+    body = cache.derive(sliced, "json", lambda: b"x" * 10, len)
+    assert cache.derive(sliced, "json", lambda: b"other", len) is body
+    assert cache.stats()["bytes"] == 110
+
+
+def test_eviction_and_replacement_drop_derived_values():
+    cache = ResponseCache(max_bytes=250)
+    first = Value()
+    cache.set("a", first, 100, ttl=60)
+    cache.derive(first, "json", lambda: b"x" * 100, len)
+    cache.set("b", Value(), 100, ttl=60)
+    assert cache.stats()["entries"] == 1 and cache.stats()["bytes"] == 100
+    # No longer cached, so nothing is memoized for it
+    assert cache.derive(first, "json", lambda: b"new", len) == b"new"
+
+    replaced = cache.last_known("b")
+    cache.set("b", Value(), 100, ttl=60)
+    assert cache.derive(replaced, "json", lambda: b"new", len) == b"new"
+    assert cache.stats()["bytes"] == 100
+    assert len(cache._owners) == 1
+
+
+def test_uncached_sources_are_not_memoized():
+    cache = ResponseCache()
+    calls = []
+    cache.derive(Value(), "json", lambda: calls.append(1) or b"", len)
+    assert calls == [1] and cache.stats()["bytes"] == 0
@@ -0,0 +1,50 @@
+from models import CitySearchResult
+from weather_service import SearchPrefixCache
+
+LONDON = CitySearchResult(name="London", region="City of London, Greater London", country="United Kingdom",
+                          lat=51.52, lon=-0.11)
+HOLBORN = CitySearchResult(name="Holborn", region="Camden Greater London", country="United Kingdom",
+                           lat=51.52, lon=-0.12)
+LONDON_ON = CitySearchResult(name="London", region="Ontario", country="Canada", lat=42.98, lon=-81.25)
+
+
+def test_exact_hit():
+    cache = SearchPrefixCache()
+    cache.set("London", [LONDON])
+    assert cache.get(" london ") == [LONDON]
+    assert cache.stats()["exact_hits"] == 1
+
+
+def test_narrowing_keeps_region_matches():
+    cache = SearchPrefixCache()
+    cache.set("lond", [LONDON, HOLBORN, LONDON_ON])
+    assert cache.get("london") == [LONDON, HOLBORN, LONDON_ON]
+    assert cache.get("londo") == [LONDON, HOLBORN, LONDON_ON]
+    assert cache.stats()["prefix_hits"] == 2
+
+
+def test_narrowing_filters_non_matches():
+    cache = SearchPrefixCache()
+    cache.set("lon", [LONDON, LONDON_ON])
+    assert cache.get("london ont") == [LONDON_ON]
+    assert cache.get("london") == [LONDON, LONDON_ON]
+
+
+def test_comma_qualified_query_is_a_miss():
+    cache = SearchPrefixCache()
+    cache.set("london", [LONDON])
+    assert cache.get("london, u") is None
+    assert cache.stats()["misses"] == 1
+
+
+def test_empty_narrowing_is_a_miss():
+    cache = SearchPrefixCache()
+    cache.set("lon", [LONDON, LONDON_ON])
+    assert cache.get("lonx") is None
+    assert cache.stats()["misses"] == 1
+
+
+def test_incomplete_prefix_is_not_used():
+    cache = SearchPrefixCache(upstream_limit=2)
+    cache.set("lon", [LONDON, LONDON_ON])
+    assert cache.get("london") is None